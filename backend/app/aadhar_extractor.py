@@ -1,15 +1,147 @@
 import re
-import spacy
-import cv2
-import numpy as np
-import pytesseract
 
+from .field_rules import FieldRules, Keywords, clean_ocr_text
+from .metrics import stage
+from .roi_ocr import ocr_regions
 
-# Load spaCy English model
-nlp = spacy.load("en_core_web_sm")
+SPACY_MODEL = "en_core_web_sm"
+NER_BATCH_SIZE = 32
+_nlp = None
 
 
-def extract_fields_from_text(text: str, file_bytes=None):
+def get_nlp():
+    """
+    Load the spaCy model on first use, trimmed to the NER component.
+    The tagger, parser, lemmatizer etc. are removed; tok2vec is kept only
+    if the model's NER listens to it.
+    """
+    global _nlp
+    if _nlp is None:
+        import spacy
+        nlp = spacy.load(SPACY_MODEL)
+        keep = {"ner"}
+        if "tok2vec" in nlp.pipe_names and "ner" in getattr(nlp.get_pipe("tok2vec"), "listening_components", []):
+            keep.add("tok2vec")
+        for name in reversed(nlp.pipe_names):
+            if name not in keep:
+                nlp.remove_pipe(name)
+        _nlp = nlp
+    return _nlp
+
+
+# --- Field rules (compiled once at import) ---
+RELATION_STOP_WORDS = r'\b(DOB|Date|Male|Gender|BWAO|fs|Ofs|fs4|BOA|S/D|W/O|D/O|{})\b.*'
+
+AADHAAR_RULES = FieldRules(
+    "AADHAAR",
+    labels={
+        "father": (r'\bFather\b', re.IGNORECASE),
+        "mother": (r'\bMother\b', re.IGNORECASE),
+        "dob_label": (r'(DOB|Date\s*of\s*Birth)', re.IGNORECASE),
+        "issue_noise": Keywords("issued", "enrol", "aadhaar"),
+        "date": r'(\d{2}[\/\-]\d{2}[\/\-]\d{4})',
+        "male": (r'\bMale\b', re.IGNORECASE),
+        "female": (r'\bFemale\b', re.IGNORECASE),
+        "name_label": (r'(Name)', re.IGNORECASE),
+        "dob_or_gender": (r'(DOB|Date\s*of\s*Birth|Male|Female)', re.IGNORECASE),
+    },
+    patterns={
+        "father_inline": (r'Father\s*[:\-]?\s*([A-Za-z\s]{2,40})', re.IGNORECASE),
+        "mother_inline": (r'Mother\s*[:\-]?\s*([A-Za-z\s]{2,40})', re.IGNORECASE),
+        "name_inline": (r'Name\s*[:\-]?\s*([A-Za-z][A-Za-z\s\.]{2,40})', re.IGNORECASE),
+        "relation_next_line": r'^[A-Za-z\s]{3,40}$',
+        "name_next_line": r'^[A-Za-z][A-Za-z\s\.]{2,40}$',
+        "name_before_relation": r'^[A-Z][A-Za-z\s]{4,40}$',
+        "title_case": r'^[A-Z][a-z]+(?:\s[A-Z][a-z]+)*$',
+        "title_case_multi": r'^[A-Z][a-z]+(?:\s[A-Z][a-z]+)+$',
+        "aadhaar_number": r'(\d{4}\s?\d{4}\s?\d{4})',
+    },
+    cleaners={
+        "Father Name": [((RELATION_STOP_WORDS.format("Husband|Father"), re.IGNORECASE), ''), (r'\s{2,}', ' ')],
+        "Mother Name": [((RELATION_STOP_WORDS.format("Mother|Wife"), re.IGNORECASE), ''), (r'\s{2,}', ' ')],
+        "ner_name": [((r'\b(Husband|Father|Wife|Son|Daughter|Mother)\b.*', re.IGNORECASE), '')],
+        "label_name": [((r'\b(Husband|Father|Wife|Mother)\b.*', re.IGNORECASE), '')],
+        "hindi_name_label": [((r'नाम\s*/\s*', re.IGNORECASE), '')],
+        "trailing_punct": [(r'[:\-\.\,]+ *$', '')],
+        "digits": [(r'\D', '')],
+    },
+)
+R = AADHAAR_RULES
+
+
+def _clean_text(text):
+    """Clean text but keep newlines intact; returns (cleaned, lines)."""
+    cleaned = clean_ocr_text(text)
+    return cleaned, cleaned.split("\n")
+
+
+def _name_before_relation(lines, scan=None):
+    """PRIMARY rule: the name-like line right before a Father/Mother line."""
+    scan = scan or R.scan(lines)
+    for i in sorted(set(scan.indexes("father") + scan.indexes("mother"))):
+        # Check previous line for name
+        if i > 0:
+            # Remove trailing colons/punctuation
+            prev_line = R.clean("trailing_punct", lines[i - 1].strip())
+            # Check if it's a name-like pattern (all caps or mixed, 5+ chars)
+            if R.match("name_before_relation", prev_line):
+                return prev_line
+    return None
+
+
+def _relation_name(scan, label):
+    """Father/Mother name: inline after the label, else the next line."""
+    i, _ = scan.first(label)
+    if i is None:
+        return None
+    lines = scan.lines
+    m = R.search(f"{label}_inline", lines[i].strip())
+    if m:
+        return m.group(1).strip()
+    if i + 1 < len(lines):
+        next_line = lines[i + 1].strip()
+        if R.match("relation_next_line", next_line):
+            return next_line
+    return None
+
+
+def _format_aadhaar(m):
+    if m:
+        digits = R.clean("digits", m.group(1))
+        if len(digits) == 12:
+            return f"{digits[:4]} {digits[4:8]} {digits[8:]}"
+    return None
+
+
+def extract_fields_from_text(text: str, document=None):
+    def parse(cleaned):
+        with stage(document, "ner"):
+            return get_nlp()(cleaned)
+    return _extract_fields(text, document, parse)
+
+
+def extract_fields_batch(texts, documents=None, batch_size=NER_BATCH_SIZE):
+    """
+    Extract many Aadhaar texts at once. The NER fallback for all texts that
+    need it runs through a single nlp.pipe() call.
+    """
+    documents = documents or [None] * len(texts)
+    cleaned = [_clean_text(text) for text in texts]
+    needs_ner = [i for i, (_, lines) in enumerate(cleaned) if not _name_before_relation(lines)]
+
+    ner_docs = {}
+    if needs_ner:
+        piped = get_nlp().pipe((cleaned[i][0] for i in needs_ner), batch_size=batch_size)
+        ner_docs = dict(zip(needs_ner, piped))
+
+    return [
+        _extract_fields(text, document, lambda _, i=i: ner_docs[i])
+        for i, (text, document) in enumerate(zip(texts, documents))
+    ]
+
+
+def _extract_fields(text, document, parse):
+    """Rule-based extraction; `parse(cleaned)` supplies the spaCy Doc when NER is needed."""
     result = {
         "Name": None,
         "Father Name": None,
@@ -21,230 +153,119 @@ def extract_fields_from_text(text: str, file_bytes=None):
     }
 
     # --- Clean text but keep newlines intact ---
-    cleaned = re.sub(r'[^A-Za-z0-9\n:/\-]', ' ', text)
-    cleaned = re.sub(r'[ \t]+', ' ', cleaned)
-    cleaned = re.sub(r'\n+', '\n', cleaned).strip()
-    lines = cleaned.split("\n")
-
-    # --- Father's Name logic (unchanged) ---
-    father_name = None
-    candidates = []
-    for i, line in enumerate(lines):
-        if re.search(r'(Father|Fathe|Fathar|Fathcr|Fatner|Fatler|frrot|frther|Pita|Pitah|Husband)', line, re.IGNORECASE):
-            candidates.append((i, line.strip()))
-    
-    chosen_line = None
-    for _, line in candidates:
-        if re.search(r'\bFather\b', line, re.IGNORECASE):
-            chosen_line = line
-            break
-    
-    if not chosen_line and candidates:
-        for _, line in candidates:
-            if re.search(r'\bFather\b', line, re.IGNORECASE):
-                chosen_line = line
-                break
-    
-    if chosen_line:
-        m = re.search(r'Father\s*[:\-]?\s*([A-Za-z\s]{2,40})', chosen_line, re.IGNORECASE)
-        if m:
-            father_name = m.group(1).strip()
-        else:
-            idx = [i for i, l in candidates if l == chosen_line]
-            if idx:
-                i = idx[0]
-                if i + 1 < len(lines):
-                    next_line = lines[i + 1].strip()
-                    if re.match(r'^[A-Za-z\s]{3,40}$', next_line):
-                        father_name = next_line
-    
-    if father_name:
-        father_name = re.sub(
-            r'\b(DOB|Date|Male|Gender|BWAO|fs|Ofs|fs4|BOA|S/D|W/O|D/O|Husband|Father)\b.*', '', father_name, flags=re.IGNORECASE
-        )
-        father_name = re.sub(r'\s{2,}', ' ', father_name).strip()
-        result["Father Name"] = father_name
-
-    # --- Mother's Name logic (same pattern as Father's Name) ---
-    mother_name = None
-    mother_candidates = []
-    for i, line in enumerate(lines):
-        if re.search(r'(Mother|Mothe|Mather|Mata|Mataji|Wife)', line, re.IGNORECASE):
-            mother_candidates.append((i, line.strip()))
-    
-    chosen_mother_line = None
-    for _, line in mother_candidates:
-        if re.search(r'\bMother\b', line, re.IGNORECASE):
-            chosen_mother_line = line
-            break
-    
-    if not chosen_mother_line and mother_candidates:
-        for _, line in mother_candidates:
-            if re.search(r'\bMother\b', line, re.IGNORECASE):
-                chosen_mother_line = line
-                break
-    
-    if chosen_mother_line:
-        m = re.search(r'Mother\s*[:\-]?\s*([A-Za-z\s]{2,40})', chosen_mother_line, re.IGNORECASE)
-        if m:
-            mother_name = m.group(1).strip()
-        else:
-            idx = [i for i, l in mother_candidates if l == chosen_mother_line]
-            if idx:
-                i = idx[0]
-                if i + 1 < len(lines):
-                    next_line = lines[i + 1].strip()
-                    if re.match(r'^[A-Za-z\s]{3,40}$', next_line):
-                        mother_name = next_line
-    
-    if mother_name:
-        mother_name = re.sub(
-            r'\b(DOB|Date|Male|Gender|BWAO|fs|Ofs|fs4|BOA|S/D|W/O|D/O|Mother|Wife)\b.*', '', mother_name, flags=re.IGNORECASE
-        )
-        mother_name = re.sub(r'\s{2,}', ' ', mother_name).strip()
-        result["Mother Name"] = mother_name
-
-    # --- DOB extraction (unchanged) ---
-    def extract_true_dob(cleaned_text):
-        lines = cleaned_text.split("\n")
-        for line in lines:
-            if re.search(r'(DOB|Date\s*of\s*Birth)', line, re.IGNORECASE) and not re.search(r'issued|enrol|aadhaar', line, re.IGNORECASE):
-                dob_match = re.search(r'(\d{2}[\/\-]\d{2}[\/\-]\d{4})', line)
-                if dob_match:
-                    return dob_match.group(1)
-        for line in lines:
-            if re.search(r'issued|enrol|aadhaar', line, re.IGNORECASE):
-                continue
-            dob_match = re.search(r'(\d{2}[\/\-]\d{2}[\/\-]\d{4})', line)
-            if dob_match:
-                return dob_match.group(1)
-        return None
+    cleaned, lines = _clean_text(text)
+
+    # --- One pass over the lines for every label ---
+    scan = R.scan(lines)
 
-    result["DOB"] = extract_true_dob(cleaned)
+    # --- Father's / Mother's Name ---
+    for field, label in (("Father Name", "father"), ("Mother Name", "mother")):
+        relation_name = _relation_name(scan, label)
+        if relation_name:
+            result[field] = R.clean(field, relation_name)
+
+    # --- DOB: a labelled date first, then any date outside issue/enrolment lines ---
+    dates = [(i, m) for i, m in scan.hits("date") if not scan.has("issue_noise", i)]
+    labelled = [m for i, m in dates if scan.has("dob_label", i)]
+    if labelled:
+        result["DOB"] = labelled[0].group(1)
+    elif dates:
+        result["DOB"] = dates[0][1].group(1)
 
     # --- Gender ---
-    if re.search(r'\bMale\b', cleaned, re.IGNORECASE):
+    if scan.has("male"):
         result["Gender"] = "Male"
-    elif re.search(r'\bFemale\b', cleaned, re.IGNORECASE):
+    elif scan.has("female"):
         result["Gender"] = "Female"
 
     # --- 🆕 PRIMARY Name Extraction: Line BEFORE Father/Mother ---
     if not result["Name"]:
-        for i, line in enumerate(lines):
-            if re.search(r'\b(Father|Mother)\b', line, re.IGNORECASE):
-                # Check previous line for name
-                if i > 0:
-                    prev_line = lines[i - 1].strip()
-                    # Remove trailing colons/punctuation
-                    prev_line = re.sub(r'[:\-\.\,]+ *$', '', prev_line).strip()
-                    # Check if it's a name-like pattern (all caps or mixed, 5+ chars)
-                    if re.match(r'^[A-Z][A-Za-z\s]{4,40}$', prev_line):
-                        result["Name"] = prev_line
-                        break
-
-    # --- Name Extraction (fallback with spaCy) ---
-    doc = nlp(cleaned)
-    persons = [ent.text.strip() for ent in doc.ents if ent.label_ == "PERSON"]
-
-    if not result["Name"] and (result["Father Name"] or result["Mother Name"]):
-        father_idx = cleaned.lower().find("father")
-        husband_idx = cleaned.lower().find("husband")
-        mother_idx = cleaned.lower().find("mother")
-        
-        # Find whichever comes first (father, husband, or mother)
-        relation_idx = min([idx for idx in [father_idx, husband_idx, mother_idx] if idx != -1], default=-1)
-        
-        before_relation = cleaned[:relation_idx] if relation_idx != -1 else cleaned
-        possible_names = [ent.text.strip() for ent in nlp(before_relation).ents if ent.label_ == "PERSON"]
-        if possible_names:
-            # Clean relationship keywords from extracted name
-            name_candidate = possible_names[-1]
-            name_candidate = re.sub(r'\b(Husband|Father|Wife|Son|Daughter|Mother)\b.*', '', name_candidate, flags=re.IGNORECASE).strip()
-            result["Name"] = name_candidate if name_candidate else possible_names[-1]
-        elif persons:
+        result["Name"] = _name_before_relation(lines, scan)
+
+    # --- Name Extraction (fallback with spaCy NER, only when the rule above failed) ---
+    if not result["Name"]:
+        # One parse of the full text; names before the relation line are the
+        # PERSON entities that end before it.
+        persons = [ent for ent in parse(cleaned).ents if ent.label_ == "PERSON"]
+        person_names = [ent.text.strip() for ent in persons]
+
+        if result["Father Name"] or result["Mother Name"]:
+            father_idx = cleaned.lower().find("father")
+            husband_idx = cleaned.lower().find("husband")
+            mother_idx = cleaned.lower().find("mother")
+
+            # Find whichever comes first (father, husband, or mother)
+            relation_idx = min([idx for idx in [father_idx, husband_idx, mother_idx] if idx != -1], default=-1)
+
+            possible_names = [
+                ent.text.strip() for ent in persons
+                if relation_idx == -1 or ent.end_char <= relation_idx
+            ]
+            if possible_names:
+                # Clean relationship keywords from extracted name
+                name_candidate = R.clean("ner_name", possible_names[-1])
+                result["Name"] = name_candidate if name_candidate else possible_names[-1]
+            elif person_names:
+                # Clean relationship keywords from persons list
+                cleaned_person = R.clean("ner_name", person_names[0])
+                result["Name"] = cleaned_person if cleaned_person else person_names[0]
+        elif person_names:
             # Clean relationship keywords from persons list
-            cleaned_person = re.sub(r'\b(Husband|Father|Wife|Son|Daughter|Mother)\b.*', '', persons[0], flags=re.IGNORECASE).strip()
-            result["Name"] = cleaned_person if cleaned_person else persons[0]
-    elif not result["Name"] and persons:
-        # Clean relationship keywords from persons list
-        cleaned_person = re.sub(r'\b(Husband|Father|Wife|Son|Daughter|Mother)\b.*', '', persons[0], flags=re.IGNORECASE).strip()
-        result["Name"] = cleaned_person if cleaned_person else persons[0]
+            cleaned_person = R.clean("ner_name", person_names[0])
+            result["Name"] = cleaned_person if cleaned_person else person_names[0]
 
     # --- Enhanced Name: handle bilingual Aadhaar and OCR variants ---
     if not result["Name"]:
-        for i, line in enumerate(lines):
-            if re.search(r'(Name)', line, re.IGNORECASE):
-                # remove Hindi or slashes
-                clean_line = re.sub(r'नाम\s*/\s*', '', line, flags=re.IGNORECASE)
-                # now extract after Name, Name:, Name-, Name :
-                m = re.search(r'Name\s*[:\-]?\s*([A-Za-z][A-Za-z\s\.]{2,40})', clean_line, re.IGNORECASE)
-                if m:
-                    possible_name = m.group(1).strip()
-                    # Remove relationship keywords from name
-                    possible_name = re.sub(r'\b(Husband|Father|Wife|Mother)\b.*', '', possible_name, flags=re.IGNORECASE).strip()
-                    if len(possible_name.split()) >= 1:
-                        result["Name"] = possible_name
-                        break
-                # FIX: If no name found after 'Name', try next line
-                elif i + 1 < len(lines):
-                    next_line = lines[i + 1].strip()
-                    # Aadhaar names can be single or multi-word
-                    if re.match(r'^[A-Za-z][A-Za-z\s\.]{2,40}$', next_line):
-                        result["Name"] = next_line
-                        break
+        for i in scan.indexes("name_label"):
+            # remove Hindi or slashes, then extract after Name, Name:, Name-, Name :
+            m = R.search("name_inline", R.clean("hindi_name_label", lines[i]))
+            if m:
+                # Remove relationship keywords from name
+                possible_name = R.clean("label_name", m.group(1).strip())
+                if len(possible_name.split()) >= 1:
+                    result["Name"] = possible_name
+                    break
+            # FIX: If no name found after 'Name', try next line
+            elif i + 1 < len(lines):
+                next_line = lines[i + 1].strip()
+                # Aadhaar names can be single or multi-word
+                if R.match("name_next_line", next_line):
+                    result["Name"] = next_line
+                    break
 
     # --- Fallback: Name directly above DOB or Gender ---
     if not result["Name"]:
-        for i, line in enumerate(lines):
-            if re.search(r'(DOB|Date\s*of\s*Birth|Male|Female)', line, re.IGNORECASE):
-                if i > 0:
-                    prev_line = lines[i - 1].strip()
-                    if re.match(r'^[A-Z][a-z]+(?:\s[A-Z][a-z]+)*$', prev_line):
-                        result["Name"] = prev_line
-                        break
+        for i in scan.indexes("dob_or_gender"):
+            if i > 0:
+                prev_line = lines[i - 1].strip()
+                if R.match("title_case", prev_line):
+                    result["Name"] = prev_line
+                    break
 
     # --- Final fallback: top 5 lines ---
     if not result["Name"]:
         for line in lines[:5]:
-            if re.match(r'^[A-Z][a-z]+(?:\s[A-Z][a-z]+)*$', line):
+            if R.match("title_case", line):
                 result["Name"] = line.strip()
                 break
 
     # --- Aadhaar Recovery (bottom region OCR + full text scan) ---
-    # First, try from bottom cropped region
+    # First, try the number strip (digits-only ROI OCR)
     aadhaar_found = None
-    if file_bytes:
-        try:
-            image_stream = np.frombuffer(file_bytes, np.uint8)
-            img = cv2.imdecode(image_stream, cv2.IMREAD_COLOR)
-            h, w, _ = img.shape
-            bottom_crop = img[int(h * 0.7):, :]
-            gray = cv2.cvtColor(bottom_crop, cv2.COLOR_BGR2GRAY)
-            gray = cv2.convertScaleAbs(gray, alpha=2, beta=0)
-            thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
-            ocr_bottom = pytesseract.image_to_string(thresh)
-            m = re.search(r'(\d{4}\s?\d{4}\s?\d{4})', ocr_bottom)
-            if m:
-                digits = re.sub(r'\D', '', m.group(1))
-                if len(digits) == 12:
-                    aadhaar_found = f"{digits[:4]} {digits[4:8]} {digits[8:]}"
-        except Exception as e:
-            print("Aadhaar OCR Error:", e)
+    if document is not None:
+        ocr_bottom = ocr_regions(document, "AADHAAR").get("aadhaar_number", "")
+        aadhaar_found = _format_aadhaar(R.search("aadhaar_number", ocr_bottom))
 
     # If bottom scan failed, look in full text (for online Aadhaar layout)
     if not aadhaar_found:
-        m = re.search(r'(\d{4}\s?\d{4}\s?\d{4})', cleaned)
-        if m:
-            digits = re.sub(r'\D', '', m.group(1))
-            if len(digits) == 12:
-                aadhaar_found = f"{digits[:4]} {digits[4:8]} {digits[8:]}"
+        aadhaar_found = _format_aadhaar(R.search("aadhaar_number", cleaned))
 
     result["Aadhaar"] = aadhaar_found
 
     # --- Final fallback: Top name ---
     if not result["Name"]:
         for line in lines[:5]:
-            if re.match(r'^[A-Z][a-z]+(?:\s[A-Z][a-z]+)+$', line):
+            if R.match("title_case_multi", line):
                 result["Name"] = line.strip()
                 break
 
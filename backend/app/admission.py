@@ -0,0 +1,69 @@
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+
+from . import metrics
+
+
+class Overloaded(Exception):
+    """Every extraction slot is busy and the wait queue is full."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"server busy, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class AdmissionControl:
+    """
+    At most `limit` extractions run at once (0 = no limit); up to
+    `queue_size` more callers wait for a slot. Beyond that, slot() raises
+    Overloaded at once, with a Retry-After estimate from recent run times.
+    """
+
+    def __init__(self, limit, queue_size):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.running = 0
+        self.waiting = 0
+        self._slots = asyncio.Semaphore(limit) if limit > 0 else None
+        self._avg_seconds = None  # moving average of extraction time
+
+    def retry_after(self) -> int:
+        """Seconds until the queue ahead of a new caller has likely drained."""
+        avg = self._avg_seconds or 1.0
+        return max(1, math.ceil(avg * (self.waiting + 1) / max(1, self.limit)))
+
+    @asynccontextmanager
+    async def slot(self, wait=False):
+        """
+        Hold an extraction slot for the block. `wait=True` (batches, jobs)
+        queues regardless of the bound; those callers have their own limits.
+        """
+        if self._slots is None:
+            yield
+            return
+        if not wait and self._slots.locked() and self.waiting >= self.queue_size:
+            metrics.ADMISSIONS.inc(result="rejected")
+            raise Overloaded(self.retry_after())
+
+        metrics.ADMISSIONS.inc(result="queued" if self._slots.locked() else "admitted")
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.running -= 1
+            self._slots.release()
+            seconds = time.perf_counter() - start
+            self._avg_seconds = seconds if self._avg_seconds is None else 0.8 * self._avg_seconds + 0.2 * seconds
+
+    def stats(self):
+        return {"limit": self.limit, "queue_size": self.queue_size,
+                "running": self.running, "waiting": self.waiting,
+                "avg_seconds": round(self._avg_seconds, 3) if self._avg_seconds else None}
@@ -0,0 +1,147 @@
+import os
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return int(value)
+
+
+# --- OCR worker pool ---
+# Number of worker processes running the decode → OCR → classify → extract
+# pipeline. 0 runs the pipeline in a thread of the API process instead.
+OCR_WORKERS = _env_int("FORMFILL_OCR_WORKERS", os.cpu_count() or 1)
+
+# "spawn" keeps workers independent of the threads uvicorn has already started.
+OCR_POOL_START_METHOD = os.getenv("FORMFILL_OCR_POOL_START_METHOD", "spawn")
+
+# --- OCR search ---
+# "cascade": engines/variants cheapest first (ocr_cascade.TIERS); stop once
+# the text's quality score (confidence + card-number pattern + length)
+# reaches OCR_CASCADE_THRESHOLD.
+# "longest": OCR every variant in sequence and keep the longest text.
+# "confidence": OCR variants in parallel, score them by mean tesseract word
+# confidence and stop as soon as one reaches OCR_CONFIDENCE_THRESHOLD.
+OCR_SEARCH_MODE = os.getenv("FORMFILL_OCR_SEARCH_MODE", "cascade")
+OCR_CASCADE_THRESHOLD = float(os.getenv("FORMFILL_OCR_CASCADE_THRESHOLD", "75"))
+# Cascade mode only: spot card markers ("income tax", "election commission",
+# "uidai", ...) in one OCR pass over an image scaled to this text height and
+# run that card's OCR plan directly. Unsure → full cascade + detect_card_type.
+OCR_PRECLASSIFY = os.getenv("FORMFILL_OCR_PRECLASSIFY", "1") == "1"
+OCR_PRECLASSIFY_TEXT_HEIGHT = float(os.getenv("FORMFILL_OCR_PRECLASSIFY_TEXT_HEIGHT", "20"))
+OCR_CONFIDENCE_THRESHOLD = float(os.getenv("FORMFILL_OCR_CONFIDENCE_THRESHOLD", "80"))
+OCR_VARIANT_THREADS = _env_int("FORMFILL_OCR_VARIANT_THREADS", 4)
+
+# --- Tesseract backend ---
+# "tesserocr":   libtesseract in-process (pip install tesserocr); one
+#                initialized API per OCR thread, no subprocess or temp files.
+# "pytesseract": the tesseract CLI, one process per call.
+# "auto":        tesserocr when installed, else pytesseract.
+TESSERACT_BACKEND = os.getenv("FORMFILL_TESSERACT_BACKEND", "auto")
+
+# --- Metrics ---
+# Add a Server-Timing header (per-stage milliseconds) to /extract responses.
+# Off by default: it tells clients how long each internal stage took.
+SERVER_TIMING = os.getenv("FORMFILL_SERVER_TIMING", "0") == "1"
+
+# --- Logging ---
+# Root level. OCR text, cleaned lines and extracted field values are only
+# logged at DEBUG; keep production at INFO.
+LOG_LEVEL = os.getenv("FORMFILL_LOG_LEVEL", "INFO").upper()
+# "json": one JSON object per line (with request_id); "text": plain lines.
+LOG_FORMAT = os.getenv("FORMFILL_LOG_FORMAT", "json")
+# Mask Aadhaar, PAN and EPIC numbers in every log line.
+LOG_REDACT = os.getenv("FORMFILL_LOG_REDACT", "1") == "1"
+
+# --- Profiling (opt-in) ---
+# Directory for sampled-stack profiles of /extract and /generate-form-pdf;
+# empty disables profiling entirely (no per-request cost). When set, a
+# request is profiled if it sends "X-FormFill-Profile: 1" or falls in the
+# PROFILE_SAMPLE_RATE fraction. /admin/profiles lists those slower than
+# PROFILE_SLOW_MS.
+PROFILE_DIR = os.getenv("FORMFILL_PROFILE_DIR", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("FORMFILL_PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = _env_int("FORMFILL_PROFILE_INTERVAL_MS", 5)
+PROFILE_SLOW_MS = _env_int("FORMFILL_PROFILE_SLOW_MS", 1000)
+PROFILE_KEEP = _env_int("FORMFILL_PROFILE_KEEP", 200)
+
+# --- /extract result cache ---
+# In-memory LRU size (0 disables the memory tier) and entry lifetime.
+RESULT_CACHE_SIZE = _env_int("FORMFILL_RESULT_CACHE_SIZE", 256)
+RESULT_CACHE_TTL = _env_int("FORMFILL_RESULT_CACHE_TTL", 3600)
+# Optional SQLite file for a disk tier that survives restarts (empty = off).
+RESULT_CACHE_DB = os.getenv("FORMFILL_RESULT_CACHE_DB", "")
+
+# --- Admission control and deadlines ---
+# Extractions running at once (0 = unlimited) and /extract requests allowed
+# to wait for a slot; past that, /extract answers 429 with Retry-After.
+# Batches and jobs wait for slots without the bound (they have their own).
+EXTRACT_CONCURRENCY = _env_int("FORMFILL_EXTRACT_CONCURRENCY", max(1, OCR_WORKERS))
+EXTRACT_QUEUE = _env_int("FORMFILL_EXTRACT_QUEUE", 4 * EXTRACT_CONCURRENCY)
+# Seconds from admission (slot acquired) until OCR stops and the best text
+# so far is used (0 = no deadline). Passed to tesseract as its timeout.
+EXTRACT_TIMEOUT = float(os.getenv("FORMFILL_EXTRACT_TIMEOUT", "30"))
+
+# --- /extract/batch ---
+# Upper bound on documents of one batch processed at the same time.
+BATCH_CONCURRENCY = _env_int("FORMFILL_BATCH_CONCURRENCY", max(1, OCR_WORKERS))
+# Most documents handed to one worker call. A chunk holds one extraction slot
+# while it runs, and its Aadhaar cards share one spaCy nlp.pipe() pass.
+BATCH_CHUNK_SIZE = _env_int("FORMFILL_BATCH_CHUNK_SIZE", 8)
+
+# --- /jobs (asynchronous extraction) ---
+# SQLite file holding queued uploads and job results; jobs survive restarts.
+JOBS_DB = os.getenv("FORMFILL_JOBS_DB", "formfill-jobs.sqlite3")
+# Jobs extracted at the same time (each one runs in the OCR worker pool).
+JOB_WORKERS = _env_int("FORMFILL_JOB_WORKERS", max(1, OCR_WORKERS))
+# Attempts per job before it is marked failed; retry n waits n × JOB_RETRY_DELAY s.
+JOB_MAX_ATTEMPTS = _env_int("FORMFILL_JOB_MAX_ATTEMPTS", 3)
+JOB_RETRY_DELAY = float(os.getenv("FORMFILL_JOB_RETRY_DELAY", "5"))
+# Seconds a finished job and its result stay readable (results hold citizen data).
+JOB_RESULT_TTL = _env_int("FORMFILL_JOB_RESULT_TTL", 3600)
+# A running job is leased to its process, which renews the lease; jobs whose
+# lease lapses (the process died) are requeued by any process sharing JOBS_DB.
+JOB_LEASE_SECONDS = _env_int("FORMFILL_JOB_LEASE_SECONDS", 60)
+
+# --- EasyOCR reader registry ---
+# One reader per language set is shared by the card detector and extractors.
+EASYOCR_LANGS = tuple(l.strip() for l in os.getenv("FORMFILL_EASYOCR_LANGS", "en,hi").split(",") if l.strip())
+EASYOCR_GPU = os.getenv("FORMFILL_EASYOCR_GPU", "0") == "1"
+
+# --- Startup ---
+# "preload": load spaCy and EasyOCR in every OCR worker during startup;
+#            /readyz reports ready only once they are resident.
+# "lazy":    import heavy dependencies the first time a card path needs them.
+STARTUP_MODE = os.getenv("FORMFILL_STARTUP_MODE", "preload")
+
+# --- Form templates ---
+# How often (seconds) a template lookup re-checks its file's mtime.
+TEMPLATE_RELOAD_INTERVAL = float(os.getenv("FORMFILL_TEMPLATE_RELOAD_INTERVAL", "2"))
+
+# --- /generate-form-pdf ---
+# In-memory cache of rendered PDFs keyed by template version + field values
+# (0 = off). Entries hold citizen data, so keep the TTL short.
+RENDER_CACHE_SIZE = _env_int("FORMFILL_RENDER_CACHE_SIZE", 64)
+RENDER_CACHE_TTL = _env_int("FORMFILL_RENDER_CACHE_TTL", 300)
+# TrueType/OpenType font embedded for values Latin-1 can't encode (Devanagari
+# names etc.). Noto Sans Devanagari is bundled in app/fonts/ (SIL OFL, see
+# OFL.txt there); point this at another Unicode font for other scripts.
+PDF_UNICODE_FONT = os.getenv(
+    "FORMFILL_PDF_FONT",
+    os.path.join(os.path.dirname(__file__), "fonts", "NotoSansDevanagari-Regular.ttf"),
+)
+# Most records /generate-form-pdf/bulk puts into one multi-page PDF (the
+# document is assembled in memory); format=zip streams and has no limit.
+BULK_PDF_MAX_PAGES = _env_int("FORMFILL_BULK_PDF_MAX_PAGES", 1000)
+
+# --- Resolution normalization (before OCR) ---
+# Uploads are rescaled so the median glyph height lands near the target:
+# down for huge phone photos, up only when text is below the minimum.
+OCR_TARGET_TEXT_HEIGHT = float(os.getenv("FORMFILL_OCR_TARGET_TEXT_HEIGHT", "30"))
+OCR_MIN_TEXT_HEIGHT = float(os.getenv("FORMFILL_OCR_MIN_TEXT_HEIGHT", "18"))
+OCR_MAX_TEXT_HEIGHT = float(os.getenv("FORMFILL_OCR_MAX_TEXT_HEIGHT", "48"))
+# Hard cap on the long side after normalization (also used when no text is found).
+OCR_MAX_SIDE = _env_int("FORMFILL_OCR_MAX_SIDE", 2400)
+# Large JPEGs are decoded at 1/2, 1/4 or 1/8 size, keeping at least this long side.
+OCR_DECODE_MIN_SIDE = _env_int("FORMFILL_OCR_DECODE_MIN_SIDE", 1600)
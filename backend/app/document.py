@@ -0,0 +1,195 @@
+import io
+import time
+
+import cv2
+import numpy as np
+from functools import cached_property
+from PIL import Image
+
+from . import config
+
+
+class DeadlineExceeded(TimeoutError):
+    """The document's extraction deadline passed before an OCR call could finish."""
+
+
+# --- Named preprocessing variants (built on demand, once per document) ---
+def _sharpen_adaptive(doc):
+    """Sharpen + denoise + gaussian adaptive threshold (hard-to-read cards)."""
+    kernel = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]])
+    sharp = cv2.filter2D(doc.bgr, -1, kernel)
+    denoise = cv2.bilateralFilter(sharp, 9, 75, 75)
+    return cv2.adaptiveThreshold(cv2.cvtColor(denoise, cv2.COLOR_BGR2GRAY), 255,
+                                 cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 2)
+
+
+VARIANTS = {
+    "gray": lambda doc: doc.gray,
+    "simple_thresh": lambda doc: cv2.threshold(doc.gray, 150, 255, cv2.THRESH_BINARY)[1],
+    "adaptive": lambda doc: cv2.adaptiveThreshold(doc.gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C,
+                                                  cv2.THRESH_BINARY, 31, 15),
+    "contrast": lambda doc: cv2.convertScaleAbs(doc.gray, alpha=1.5, beta=0),
+    "adaptive_gaussian": lambda doc: cv2.adaptiveThreshold(doc.gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                                           cv2.THRESH_BINARY, 31, 2),
+    "sharp_adaptive": _sharpen_adaptive,
+}
+
+
+# --- Resolution normalization ---
+_REDUCED_DECODE = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2,
+                   4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
+
+
+def _decode(file_bytes):
+    """
+    Decode upload bytes; large JPEGs are decoded at 1/2, 1/4 or 1/8 size
+    (libjpeg skips the DCT work) while keeping OCR_DECODE_MIN_SIDE.
+    Returns (bgr or None, scale relative to the uploaded pixels).
+    """
+    factor = 1
+    long_side = None
+    if file_bytes[:2] == b"\xff\xd8":
+        try:
+            long_side = max(Image.open(io.BytesIO(file_bytes)).size)  # header only
+        except Exception:
+            long_side = None
+        if long_side:
+            factor = next((f for f in (8, 4, 2) if long_side / f >= config.OCR_DECODE_MIN_SIDE), 1)
+
+    img = cv2.imdecode(np.frombuffer(file_bytes, np.uint8), _REDUCED_DECODE[factor])
+    if img is None:
+        return None, 1.0
+    return img, (max(img.shape[:2]) / long_side if factor > 1 else 1.0)
+
+
+def estimate_text_height(gray, work_side=1200):
+    """
+    Median glyph height in pixels: connected components of an adaptive
+    threshold, filtered to letter-like boxes. None if too few are found.
+    """
+    f = min(1.0, work_side / max(gray.shape[:2]))
+    small = cv2.resize(gray, None, fx=f, fy=f, interpolation=cv2.INTER_AREA) if f < 1 else gray
+    binary = cv2.adaptiveThreshold(small, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 31, 15)
+    _, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    hs = stats[1:, cv2.CC_STAT_HEIGHT]
+    ws = stats[1:, cv2.CC_STAT_WIDTH]
+    areas = stats[1:, cv2.CC_STAT_AREA]
+    glyphs = ((hs >= 6) & (hs <= small.shape[0] * 0.15)
+              & (ws <= hs * 2) & (ws * 10 >= hs) & (areas * 10 >= hs * ws))
+    if glyphs.sum() < 15:
+        return None
+    return float(np.median(hs[glyphs])) / f
+
+
+def normalizing_scale(text_height, height, width):
+    """Resize factor that brings text into the OCR range and the long side under OCR_MAX_SIDE."""
+    scale = 1.0
+    if text_height and not (config.OCR_MIN_TEXT_HEIGHT <= text_height <= config.OCR_MAX_TEXT_HEIGHT):
+        scale = min(config.OCR_TARGET_TEXT_HEIGHT / text_height, 3.0)
+    long_side = max(height, width) * scale
+    if long_side > config.OCR_MAX_SIDE:
+        scale *= config.OCR_MAX_SIDE / long_side
+    return round(scale, 3)
+
+
+class DecodedDocument:
+    """
+    One uploaded image, decoded once and shared by the detector and extractors.
+    Derived images (variants, crops, resizes) are computed lazily and memoized,
+    so each one is built at most once per request.
+    """
+
+    def __init__(self, bgr, scale=1.0, deadline=None):
+        self.bgr = bgr
+        self.scale = scale  # size relative to the uploaded image
+        self.text_height = None
+        self.timings = []  # stage / OCR call durations, shipped back with the result
+        self.deadline = deadline  # time.time() by which OCR must stop (None = no limit)
+        self.deadline_exceeded = False  # an OCR call was skipped or cut short
+        self._memo = {}
+
+    @classmethod
+    def from_bytes(cls, file_bytes, deadline=None):
+        """Decode raw upload bytes; returns None if the image can't be decoded."""
+        if not file_bytes:
+            return None
+        img, scale = _decode(file_bytes)
+        if img is None:
+            return None
+        return cls(img, scale, deadline)
+
+    # --- Deadline ---
+    def expired(self):
+        return self.deadline is not None and time.time() >= self.deadline
+
+    def time_left(self):
+        """
+        Seconds until the deadline, or None without one. Raises
+        DeadlineExceeded once it has passed (and flags the document).
+        """
+        if self.deadline is None:
+            return None
+        left = self.deadline - time.time()
+        if left <= 0:
+            self.deadline_exceeded = True
+            raise DeadlineExceeded("extraction deadline passed")
+        return left
+
+    def normalize_resolution(self):
+        """
+        Rescale to the OCR text-height range before anything else is derived
+        from the image. Returns the factor applied (1.0 = untouched).
+        """
+        text_height = estimate_text_height(self.gray)
+        scale = normalizing_scale(text_height, self.height, self.width)
+        if scale != 1.0:
+            interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
+            self.bgr = cv2.resize(self.bgr, None, fx=scale, fy=scale, interpolation=interpolation)
+            self.__dict__.pop("gray", None)
+            self._memo.clear()
+        self.scale *= scale
+        self.text_height = round(text_height * scale, 1) if text_height else None
+        return scale
+
+    @cached_property
+    def gray(self):
+        return cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY)
+
+    @property
+    def height(self):
+        return self.bgr.shape[0]
+
+    @property
+    def width(self):
+        return self.bgr.shape[1]
+
+    def memo(self, key, build):
+        """Return the cached value for `key`, building it with `build()` on first use."""
+        if key not in self._memo:
+            self._memo[key] = build()
+        return self._memo[key]
+
+    def image(self, source="bgr"):
+        """The original BGR image, or a named entry of VARIANTS."""
+        if source == "bgr":
+            return self.bgr
+        return self.variant(source)
+
+    def variant(self, name):
+        return self.memo(("variant", name), lambda: VARIANTS[name](self))
+
+    def crop(self, top=0.0, bottom=1.0, left=0.0, right=1.0, source="bgr"):
+        """Crop by fractions of the image size (a view, not a copy)."""
+        def build():
+            img = self.image(source)
+            h, w = img.shape[:2]
+            return img[int(h * top):int(h * bottom), int(w * left):int(w * right)]
+        return self.memo(("crop", source, top, bottom, left, right), build)
+
+    def resize(self, scale, source="bgr", interpolation=cv2.INTER_CUBIC):
+        if scale == 1:
+            return self.image(source)
+        return self.memo(
+            ("resize", source, scale, interpolation),
+            lambda: cv2.resize(self.image(source), None, fx=scale, fy=scale, interpolation=interpolation),
+        )
@@ -0,0 +1,126 @@
+import re
+
+
+class Keywords:
+    """
+    Case-insensitive substring label, for plain keyword lists where a regex
+    would only add cost. search() returns the first keyword found, or None.
+    """
+
+    def __init__(self, *words):
+        self.words = tuple(w.lower() for w in words)
+
+    def search(self, line):
+        return self.search_lower(line.lower())
+
+    def search_lower(self, low):
+        """search() on a line that is already lower-cased."""
+        for word in self.words:
+            if word in low:
+                return word
+        return None
+
+
+def _compile(spec):
+    """Accept a pattern string, a (pattern, flags) tuple or an already compiled regex."""
+    if isinstance(spec, (re.Pattern, Keywords)):
+        return spec
+    if isinstance(spec, tuple):
+        return re.compile(*spec)
+    return re.compile(spec)
+
+
+class LineScan:
+    """
+    Label hits over the cleaned lines: for every label, the (line index,
+    match) pairs in line order. One pass over the lines, checking every
+    label on each line.
+    """
+
+    def __init__(self, lines, labels):
+        self.lines = lines
+        self._hits = {label: [] for label in labels}
+        regexes = [(self._hits[label], p.search) for label, p in labels.items() if not isinstance(p, Keywords)]
+        keywords = [(self._hits[label], p.search_lower) for label, p in labels.items() if isinstance(p, Keywords)]
+        for i, line in enumerate(lines):
+            for found, search in regexes:
+                m = search(line)
+                if m:
+                    found.append((i, m))
+            if keywords:
+                low = line.lower()  # once per line for all keyword labels
+                for found, search in keywords:
+                    m = search(low)
+                    if m:
+                        found.append((i, m))
+        self._index_sets = {label: {i for i, _ in found} for label, found in self._hits.items()}
+
+    def hits(self, label):
+        return self._hits[label]
+
+    def indexes(self, label):
+        return [i for i, _ in self.hits(label)]
+
+    def first(self, label):
+        """First (index, match) for `label`, or (None, None)."""
+        found = self.hits(label)
+        return found[0] if found else (None, None)
+
+    def has(self, label, index=None):
+        found = self.hits(label)
+        if index is None:
+            return bool(found)
+        return index in self._index_sets[label]
+
+
+class FieldRules:
+    """
+    Compiled rules for one card type:
+
+    - labels:     regexes (or Keywords) searched on every line by scan()
+    - patterns:   value extractors / validators applied to candidate lines
+    - cleaners:   ordered (pattern, replacement) substitutions per field
+
+    Everything is compiled once, when the extractor module is imported.
+    """
+
+    def __init__(self, card_type, labels, patterns=None, cleaners=None):
+        self.card_type = card_type
+        self.labels = {name: _compile(spec) for name, spec in labels.items()}
+        self.patterns = {name: _compile(spec) for name, spec in (patterns or {}).items()}
+        self.cleaners = {
+            name: [(_compile(spec), repl) for spec, repl in steps]
+            for name, steps in (cleaners or {}).items()
+        }
+        RULES[card_type] = self
+
+    def scan(self, lines):
+        return LineScan(lines, self.labels)
+
+    def search(self, name, text):
+        return self.patterns[name].search(text)
+
+    def match(self, name, text):
+        return self.patterns[name].match(text)
+
+    def clean(self, name, value):
+        for pattern, repl in self.cleaners[name]:
+            value = pattern.sub(repl, value)
+        return value.strip()
+
+
+# card type -> FieldRules, filled in as extractor modules are imported.
+RULES = {}
+
+
+# --- Shared text cleanup ---
+_NON_TEXT = re.compile(r'[^A-Za-z0-9\n:/\-]')
+_BLANKS = re.compile(r'[ \t]+')
+_NEWLINES = re.compile(r'\n+')
+
+
+def clean_ocr_text(text):
+    """Keep letters, digits and `:/-`, collapse blanks, keep newlines intact."""
+    cleaned = _NON_TEXT.sub(' ', text)
+    cleaned = _BLANKS.sub(' ', cleaned)
+    return _NEWLINES.sub('\n', cleaned).strip()
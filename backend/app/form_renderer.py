@@ -0,0 +1,186 @@
+import importlib.util
+import logging
+import os
+import threading
+import zipfile
+
+from fpdf import FPDF
+
+from . import config
+
+logger = logging.getLogger("form_renderer")
+
+LABEL_WIDTH = 50
+ROW_HEIGHT = 8
+UNICODE_FAMILY = "formfill-unicode"
+
+# Devanagari needs glyph shaping (matras, conjuncts); fpdf2 does it through
+# uharfbuzz when installed. Without it the glyphs are placed unshaped.
+HARFBUZZ_AVAILABLE = importlib.util.find_spec("uharfbuzz") is not None
+
+# The bundled font's ttfautohint table can't be subset; fontTools drops it
+# (harmless) and would log that for every PDF.
+logging.getLogger("fontTools.subset").setLevel(logging.ERROR)
+
+UNICODE_FONT_AVAILABLE = os.path.isfile(config.PDF_UNICODE_FONT)
+if not UNICODE_FONT_AVAILABLE:
+    logger.warning(
+        f"⚠️ Unicode PDF font not found at {config.PDF_UNICODE_FONT}; "
+        "non-Latin values will be rendered as '?'"
+    )
+
+
+def ascii_safe(s):
+    if not isinstance(s, str):
+        s = str(s)
+    s = s.replace('—', '-')
+    return s.encode("latin1", "replace").decode("latin1")
+
+
+def needs_unicode(s):
+    """True if `s` can't be drawn with the built-in (Latin-1) PDF fonts."""
+    try:
+        s.replace('—', '-').encode("latin1")
+        return False
+    except UnicodeEncodeError:
+        return True
+
+
+def _add_unicode_font(pdf):
+    """Add the Unicode font to the document once; fpdf2 embeds only the glyphs drawn."""
+    if UNICODE_FAMILY not in pdf.fonts:
+        pdf.add_font(UNICODE_FAMILY, "", config.PDF_UNICODE_FONT)
+        if HARFBUZZ_AVAILABLE:
+            pdf.set_text_shaping(True)
+
+
+def _use_font(pdf, text, style, size):
+    """Select a font able to draw `text`; returns the text to draw."""
+    if UNICODE_FONT_AVAILABLE and needs_unicode(text):
+        _add_unicode_font(pdf)
+        pdf.set_font(UNICODE_FAMILY, "", size)
+        return text
+    pdf.set_font("Helvetica", style, size)
+    return ascii_safe(text)
+
+
+class RenderPlan:
+    """
+    One template compiled for rendering: the title and labels resolved once
+    (font, drawable text, baseline position), plus the value slots. A render
+    places the prepared labels and only lays out the values.
+    """
+
+    def __init__(self, template):
+        self.template = template
+        self.title = template.get("form_name", "Government Form")
+        self.layout = template.get("layout", {})
+        self.slots = [
+            (field, pos["x"] + LABEL_WIDTH, pos["y"]) for field, pos in self.layout.items()
+        ]
+
+        page = FPDF()  # page geometry and cell margin only
+        self.labels = [_compile_label(page, page.l_margin, page.t_margin, 0, 10, self.title, 16)]
+        self.labels += [
+            _compile_label(page, pos["x"], pos["y"], LABEL_WIDTH, ROW_HEIGHT, f"{field}:", 11)
+            for field, pos in self.layout.items()
+        ]
+
+    def _draw_labels(self, pdf):
+        for unicode, text, size, box, origin in self.labels:
+            if unicode:
+                # text() doesn't shape glyphs; Devanagari needs cell().
+                pdf.set_xy(box[0], box[1])
+                pdf.cell(box[2], box[3], _use_font(pdf, text, "B", size))
+            else:
+                pdf.set_font("Helvetica", "B", size)
+                pdf.text(origin[0], origin[1], text)
+
+    def draw_page(self, pdf, fields):
+        pdf.add_page()
+        self._draw_labels(pdf)
+        for field, x, y in self.slots:
+            value = fields.get(field, "")
+            pdf.set_xy(x, y)
+            pdf.cell(0, ROW_HEIGHT, _use_font(pdf, str(value if value is not None else ""), "", 11))
+
+
+def _compile_label(page, x, y, w, h, text, size):
+    """
+    A bold label drawn like cell(w, h, text) at (x, y), as (unicode, text,
+    size, cell box, baseline origin). cell() starts the text one cell margin
+    in and puts the baseline 0.3 × font size below the middle of the cell.
+    """
+    unicode = UNICODE_FONT_AVAILABLE and needs_unicode(text)
+    origin = (x + page.c_margin, y + 0.5 * h + 0.3 * size / page.k)
+    return unicode, text if unicode else ascii_safe(text), size, (x, y, w, h), origin
+
+
+_plans = {}  # template name -> RenderPlan
+_plans_lock = threading.Lock()
+
+
+def get_plan(template_name, template):
+    """The render plan for `template`, recompiled when the registry reloads it."""
+    with _plans_lock:
+        plan = _plans.get(template_name)
+        if plan is None or plan.template is not template:
+            plan = RenderPlan(template)
+            _plans[template_name] = plan
+            logger.info(f"🖨️ Compiled render plan for '{template_name}' ({len(plan.slots)} slots)")
+        return plan
+
+
+def new_document():
+    return FPDF()
+
+
+def finish_document(pdf) -> bytes:
+    return bytes(pdf.output())
+
+
+def render_form_pdf(plan, mapped_fields) -> bytes:
+    """Draw one filled form; returns the PDF bytes."""
+    pdf = new_document()
+    plan.draw_page(pdf, mapped_fields)
+    return finish_document(pdf)
+
+
+class ZipStream:
+    """
+    ZIP archive written as a stream: add() returns the bytes for one entry
+    as soon as it is written, close() the central directory. Nothing but the
+    entry being added is held in memory. PDFs are already compressed, so
+    entries are stored.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+        # No seek(): ZipFile falls back to data descriptors and never rewinds.
+        self._zip = zipfile.ZipFile(self, mode="w", compression=zipfile.ZIP_STORED)
+
+    # File-object interface for ZipFile
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def _drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+    def add(self, name, data) -> bytes:
+        self._zip.writestr(name, data)
+        return self._drain()
+
+    def close(self) -> bytes:
+        self._zip.close()
+        return self._drain()
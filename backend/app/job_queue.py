@@ -0,0 +1,279 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from .logging_config import request_id
+from .metrics import JOBS
+
+logger = logging.getLogger("job_queue")
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class JobQueue:
+    """
+    Durable extraction jobs in a SQLite file. Uploads are stored with the
+    job, so queued and interrupted jobs are picked up again after a
+    restart. `workers` asyncio tasks claim jobs and await `handler(upload,
+    use_cache)`; a raising handler is retried up to `max_attempts` times.
+    Finished jobs (and their results) are deleted `ttl` seconds later.
+
+    Several processes may share the file: a claim is a conditional UPDATE,
+    and a running job holds a lease (owner + expiry) that its process
+    renews. Only jobs whose lease ran out, i.e. whose process died, are
+    requeued.
+
+    The connection belongs to one database thread; every query runs there,
+    never on the event loop.
+    """
+
+    def __init__(self, db_path, workers=1, max_attempts=3, retry_delay=5.0, ttl=3600, lease=60):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.ttl = ttl
+        self.lease = lease
+        self.owner = uuid.uuid4().hex  # this process, in the lease columns
+        self._running = set()
+        self._db = None
+        self._db_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="jobs-db")
+        self._db_thread.submit(self._open, db_path).result()
+        self._wakeup = None
+        self._tasks = []
+        self._handler = None
+        logger.info(f"🗃️ Job queue: {db_path}")
+
+    # --- Storage (database thread) ---
+    def _open(self, db_path):
+        self._db = sqlite3.connect(db_path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # In WAL mode NORMAL still survives a process crash; only an OS crash
+        # can lose the last commits.
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+            "use_cache INTEGER NOT NULL, upload BLOB, result TEXT, error TEXT, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL, run_after REAL NOT NULL, expires_at REAL)"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        for column in ("owner TEXT", "lease_until REAL"):
+            if column.split()[0] not in columns:
+                self._db.execute(f"ALTER TABLE jobs ADD COLUMN {column}")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (status, run_after)")
+        self._db.commit()
+
+    def _execute(self, sql, params=()):
+        cursor = self._db.execute(sql, params)
+        self._db.commit()
+        return cursor
+
+    async def _run_db(self, fn, *args):
+        """Run fn(*args) on the database thread."""
+        return await asyncio.get_running_loop().run_in_executor(self._db_thread, fn, *args)
+
+    def _insert(self, job_id, upload, use_cache):
+        now = time.time()
+        self._execute(
+            "INSERT INTO jobs (id, status, use_cache, upload, created_at, updated_at, run_after) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, QUEUED, int(use_cache), upload, now, now, now),
+        )
+
+    def _select(self, job_id):
+        return self._db.execute(
+            "SELECT status, attempts, result, error, created_at, updated_at, expires_at FROM jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+
+    def _count(self):
+        return self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+
+    def _claim(self):
+        """
+        Oldest runnable job as (id, upload, use_cache), leased to this
+        process; or None. The UPDATE only succeeds while the job is still
+        queued, so two processes never both claim it.
+        """
+        now = time.time()
+        row = self._db.execute(
+            "UPDATE jobs SET status = ?, updated_at = ?, owner = ?, lease_until = ? "
+            "WHERE id = (SELECT id FROM jobs WHERE status = ? AND run_after <= ? ORDER BY created_at LIMIT 1) "
+            "AND status = ? RETURNING id, upload, use_cache",
+            (RUNNING, now, self.owner, now + self.lease, QUEUED, now, QUEUED),
+        ).fetchone()
+        self._db.commit()
+        if row is None:
+            return None
+        return row[0], row[1], bool(row[2])
+
+    def _finish(self, job_id, status, result=None, error=None):
+        """Close a run of this process as done/failed; it counts as an attempt."""
+        now = time.time()
+        self._execute(
+            "UPDATE jobs SET status = ?, attempts = attempts + 1, result = ?, error = ?, upload = NULL, "
+            "updated_at = ?, expires_at = ?, owner = NULL, lease_until = NULL WHERE id = ? AND owner = ?",
+            (status, json.dumps(result) if result is not None else None, error, now, now + self.ttl,
+             job_id, self.owner),
+        )
+
+    def _retry_or_fail(self, job_id, error, result=None):
+        """Requeue with backoff while attempts remain; else finish as failed (with `result`, if any)."""
+        attempts = self._db.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()[0] + 1
+        if attempts >= self.max_attempts:
+            self._finish(job_id, FAILED, result=result, error=error)
+            JOBS.inc(event="failed")
+            return False
+        now = time.time()
+        # Linear backoff: retry_delay, 2 × retry_delay, ...
+        self._execute(
+            "UPDATE jobs SET status = ?, attempts = ?, error = ?, updated_at = ?, run_after = ?, "
+            "owner = NULL, lease_until = NULL WHERE id = ? AND owner = ?",
+            (QUEUED, attempts, error, now, now + self.retry_delay * attempts, job_id, self.owner),
+        )
+        JOBS.inc(event="retried")
+        return True
+
+    def _renew_leases(self, job_ids):
+        if job_ids:
+            self._execute(
+                f"UPDATE jobs SET lease_until = ? WHERE owner = ? AND id IN ({','.join('?' * len(job_ids))})",
+                (time.time() + self.lease, self.owner, *job_ids),
+            )
+
+    def _recover(self):
+        """
+        Running jobs whose lease has run out (their process died) count one
+        attempt: they are requeued, or failed once out of attempts.
+        """
+        now = time.time()
+        lapsed = "status = ? AND (lease_until IS NULL OR lease_until < ?)"
+        failed = self._db.execute(
+            "UPDATE jobs SET status = ?, attempts = attempts + 1, error = ?, upload = NULL, updated_at = ?, "
+            f"expires_at = ?, owner = NULL, lease_until = NULL WHERE {lapsed} AND attempts + 1 >= ?",
+            (FAILED, "Interrupted: the process running the job died", now, now + self.ttl, RUNNING, now, self.max_attempts),
+        ).rowcount
+        requeued = self._db.execute(
+            "UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ?, owner = NULL, lease_until = NULL "
+            f"WHERE {lapsed}",
+            (QUEUED, now, RUNNING, now),
+        ).rowcount
+        self._db.commit()
+        if requeued:
+            logger.info(f"🗃️ Requeued {requeued} interrupted job(s)")
+        if failed:
+            logger.warning(f"⚠️ {failed} interrupted job(s) out of attempts, marked failed")
+            JOBS.inc(failed, event="failed")
+
+    def _release(self):
+        """Hand this process's running jobs back to the queue; the interrupted runs don't count."""
+        self._execute(
+            "UPDATE jobs SET status = ?, updated_at = ?, owner = NULL, lease_until = NULL "
+            "WHERE status = ? AND owner = ?",
+            (QUEUED, time.time(), RUNNING, self.owner),
+        )
+        self._db.close()
+
+    def _purge(self):
+        self._execute("DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),))
+
+    # --- API (event loop) ---
+    async def submit(self, upload: bytes, use_cache=True) -> str:
+        job_id = uuid.uuid4().hex
+        await self._run_db(self._insert, job_id, upload, use_cache)
+        JOBS.inc(event="submitted")
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    async def get(self, job_id):
+        """Job status as a dict, or None when unknown or expired."""
+        row = await self._run_db(self._select, job_id)
+        if row is None or (row[6] is not None and row[6] < time.time()):
+            return None
+        status, attempts, result, error, created_at, updated_at, _ = row
+        job = {"job_id": job_id, "status": status, "attempts": attempts,
+               "created_at": created_at, "updated_at": updated_at}
+        if result is not None:
+            job["result"] = json.loads(result)
+        if error is not None:
+            job["error"] = error
+        return job
+
+    async def stats(self):
+        rows = await self._run_db(self._count)
+        return {"workers": self.workers, **{status: 0 for status in (QUEUED, RUNNING, DONE, FAILED)}, **dict(rows)}
+
+    # --- Workers ---
+    def start(self, handler):
+        """Start the worker tasks (call from the running event loop)."""
+        self._handler = handler
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(max(1, self.workers))]
+        self._tasks.append(asyncio.create_task(self._housekeeping()))
+        logger.info(f"🗃️ Job queue started with {len(self._tasks)} worker(s)")
+
+    async def stop(self):
+        """Cancel the workers and hand the jobs they were running back to the queue."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self._run_db(self._release)
+        self._db_thread.shutdown()
+
+    async def _housekeeping(self):
+        """Renew this process's leases; requeue other processes' lapsed ones; purge."""
+        await self._run_db(self._recover)
+        await self._run_db(self._purge)
+        last_purge = time.time()
+        while True:
+            await asyncio.sleep(max(1.0, self.lease / 3))
+            await self._run_db(self._renew_leases, list(self._running))
+            await self._run_db(self._recover)
+            if time.time() - last_purge > 60:
+                await self._run_db(self._purge)
+                last_purge = time.time()
+
+    async def _worker(self):
+        while True:
+            self._wakeup.clear()
+            claimed = await self._run_db(self._claim)
+            if claimed is None:
+                try:
+                    # Poll now and then for retries whose backoff has passed.
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(*claimed)
+
+    async def _run(self, job_id, upload, use_cache):
+        token = request_id.set(f"job-{job_id[:12]}")
+        self._running.add(job_id)
+        try:
+            try:
+                result = await self._handler(upload, use_cache)
+            except Exception as e:
+                logger.exception(f"❌ Job {job_id} failed")
+                if await self._run_db(self._retry_or_fail, job_id, f"Extraction failed: {e}"):
+                    logger.info(f"🔁 Job {job_id} requeued")
+                return
+            if result.get("deadline_exceeded"):
+                # Ran out of time (busy workers, slow engine): worth another try.
+                error = result.get("error") or "OCR deadline exceeded"
+                if await self._run_db(self._retry_or_fail, job_id, error, result):
+                    logger.info(f"🔁 Job {job_id} hit its deadline, requeued")
+                return
+            # The pipeline reporting "OCR failed" is an answer, not a transient error.
+            status = FAILED if "error" in result else DONE
+            await self._run_db(self._finish, job_id, status, result, result.get("error"))
+            JOBS.inc(event=status)
+            logger.info(f"🏁 Job {job_id} {status}")
+        finally:
+            self._running.discard(job_id)
+            request_id.reset(token)
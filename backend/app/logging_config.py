@@ -0,0 +1,111 @@
+import atexit
+import contextvars
+import json
+import logging
+import queue
+import re
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+from . import config
+
+# Id of the request being handled; set by the API middleware and carried
+# into OCR threads and worker processes (see with_request_id).
+request_id = contextvars.ContextVar("request_id", default="-")
+
+_listener = None
+
+# --- Redaction ---
+# Card numbers are masked in every log line before it leaves the process;
+# the last four characters stay visible so lines can still be correlated.
+REDACT_PATTERNS = [
+    # Aadhaar: 12 digits, usually printed as 4-4-4
+    re.compile(r'(?<!\d)\d{4}[ -]?\d{4}[ -]?(\d{4})(?!\d)'),
+    # PAN: AAAAA9999A
+    re.compile(r'\b[A-Z]{5}\d(\d{3}[A-Z])\b'),
+    # EPIC (Voter ID): AAA9999999
+    re.compile(r'\b[A-Z]{3}\d{3}(\d{4})\b'),
+]
+
+
+def redact(text: str) -> str:
+    """Mask Aadhaar, PAN and EPIC numbers in `text`."""
+    for pattern in REDACT_PATTERNS:
+        text = pattern.sub(lambda m: "*" * (len(m[0]) - len(m[1])) + m[1], text)
+    return text
+
+
+class _RedactingQueueHandler(QueueHandler):
+    """
+    Enqueue a flattened, redacted copy of the record. Formatting and the
+    write to stderr happen on the listener thread, off the request path.
+    """
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(record.__dict__)
+        message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if config.LOG_REDACT:
+            message = redact(message)
+            if record.exc_text:
+                record.exc_text = redact(record.exc_text)
+        record.msg, record.args = message, None
+        record.request_id = request_id.get()
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, request id, message."""
+
+    def format(self, record):
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)) + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "process": record.process,
+            "message": record.getMessage(),
+        }
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def setup_logging():
+    """
+    Configure the root logger once per process (API process and each OCR
+    worker): records go through a queue to a listener thread that writes
+    JSON (or plain text) lines to stderr.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler(sys.stderr)
+    if config.LOG_FORMAT == "json":
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(logging.Formatter(
+            "%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"))
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(_RedactingQueueHandler(queue.SimpleQueue()))
+    root.setLevel(config.LOG_LEVEL)
+
+    _listener = QueueListener(root.handlers[0].queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)  # flush queued lines on shutdown
+
+
+def with_request_id(rid, fn, *args):
+    """Run fn(*args) with `rid` as the current request id (for pool tasks)."""
+    token = request_id.set(rid)
+    try:
+        return fn(*args)
+    finally:
+        request_id.reset(token)
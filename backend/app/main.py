@@ -1,33 +1,101 @@
-from fastapi import FastAPI, File, UploadFile, Body
-from fastapi.middleware.cors import CORSMiddleware
-import re, cv2, numpy as np
-from PIL import Image
-import pytesseract
+from .startup import timed_import, timed_imports, log_import_breakdown, readiness
+
+with timed_import("fastapi"):
+    from fastapi import FastAPI, File, UploadFile, HTTPException, Request
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import JSONResponse, Response, StreamingResponse
+    from starlette.concurrency import run_in_threadpool
+import asyncio
 import logging
-from rich.logging import RichHandler  # 👈 pretty
-from difflib import get_close_matches
-from typing import Dict
-from pydantic import BaseModel
+import math
+import time
+import uuid
+from typing import Dict, List, Optional, Union
+from pydantic import BaseModel, ValidationError
+from contextlib import asynccontextmanager
 import os
 import json
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-TEMPLATE_DIR = os.path.join(BASE_DIR, "templates")
+from . import config
+from . import metrics
+from . import profiler
+from .logging_config import setup_logging, request_id
+from .job_queue import JobQueue
+from .admission import AdmissionControl, Overloaded
 
 
 # --- Setup Logging ---
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(message)s",
-    datefmt="[%X]",
-    handlers=[RichHandler(rich_tracebacks=True)]
-)
+setup_logging()
 logger = logging.getLogger("backend")
 
 logger.info("🚀 Backend started — FormFill API running")
 
+# Heavy libraries shared by every card path. spaCy and EasyOCR (torch) are
+# not listed: they load in preload_models() or on first use in lazy mode.
+timed_imports(["numpy", "cv2", "pytesseract", "PIL", "fpdf"])
+
+with timed_import("app.pipeline"):
+    from .pipeline import run_extraction, run_extraction_batch, ocr_config_fingerprint, preload_models, worker_status
+with timed_import("app.worker_pool"):
+    from .worker_pool import start_pool, shutdown_pool, run_in_pool, warm_pool
+    from .ocr_engines import engine_stats
+
+
+# --- Startup: preload / lazy ---
+async def _preload_models():
+    """Background startup task for preload mode; /readyz turns ready when it finishes."""
+    start = time.perf_counter()
+    try:
+        if start_pool() is not None:
+            # Idle workers answer first; keep asking until every process has reported in.
+            workers = {}
+            while len(workers) < config.OCR_WORKERS:
+                for status in await warm_pool(worker_status):
+                    workers[str(status["pid"])] = status["models"]
+                if len(workers) < config.OCR_WORKERS:
+                    await asyncio.sleep(0.2)
+            readiness["models"] = workers
+        else:
+            readiness["models"] = {str(os.getpid()): await run_in_threadpool(preload_models)}
+        readiness["ready"] = True
+        logger.info(f"✅ Models resident after {time.perf_counter() - start:.1f}s — ready")
+    except Exception as e:
+        readiness["error"] = str(e)
+        logger.exception("❌ Model preload failed")
+
+
 # --- FastAPI Setup ---
-app = FastAPI(title="FormFill API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    readiness["mode"] = config.STARTUP_MODE
+    log_import_breakdown()
+    template_registry.load_all()
+    start_pool()
+
+    preload_task = None
+    if config.STARTUP_MODE == "preload":
+        preload_task = asyncio.create_task(_preload_models())
+    else:
+        readiness["ready"] = True
+    global jobs
+    jobs = JobQueue(
+        config.JOBS_DB,
+        workers=config.JOB_WORKERS,
+        max_attempts=config.JOB_MAX_ATTEMPTS,
+        retry_delay=config.JOB_RETRY_DELAY,
+        ttl=config.JOB_RESULT_TTL,
+        lease=config.JOB_LEASE_SECONDS,
+    )
+    jobs.start(lambda upload, use_cache: extract_document(upload, use_cache=use_cache, wait_for_slot=True))
+    yield
+    if preload_task is not None:
+        preload_task.cancel()
+    await jobs.stop()
+    shutdown_pool()
+    result_cache.close()
+
+
+app = FastAPI(title="FormFill API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -37,177 +105,485 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# --- Image preprocessing helper ---
-def preprocess_image_auto(file_bytes):
-    """Try multiple preprocessing methods and return the best OCR text."""
-    image_stream = np.frombuffer(file_bytes, np.uint8)
-    img = cv2.imdecode(image_stream, cv2.IMREAD_COLOR)
-    if img is None:
-        logger.error("❌ Image decode failed")
-        return None, "Image decode failed"
-
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    methods = {
-        "gray": gray,
-        "simple_thresh": cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY)[1],
-        "adaptive": cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C,
-                                          cv2.THRESH_BINARY, 31, 15),
-        "contrast": cv2.convertScaleAbs(gray, alpha=1.5, beta=0)
-    }
-
-    best_text = ""
-    best_method = "gray"
-
-    for name, img_proc in methods.items():
-        try:
-            text = pytesseract.image_to_string(img_proc)
-            if len(text) > len(best_text):
-                best_text = text
-                best_method = name
-        except Exception:
-            pass
 
-    return best_text, best_method
+@app.middleware("http")
+async def assign_request_id(request: Request, call_next):
+    """Tag every log line of the request with an id (client-supplied X-Request-ID or a new one)."""
+    rid = request.headers.get("x-request-id") or uuid.uuid4().hex[:16]
+    token = request_id.set(rid[:64])
+    try:
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request_id.get()
+        return response
+    finally:
+        request_id.reset(token)
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        metrics.REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=status,
+        )
+        if status >= 500:
+            metrics.ERRORS.inc(kind="http_5xx")
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+# --- Health / readiness probes ---
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    body = {"status": "ready" if readiness["ready"] else "starting", **readiness}
+    return JSONResponse(body, status_code=200 if readiness["ready"] else 503)
+
+
+# --- OCR pipeline (runs in the worker pool) ---
+from .result_cache import ResultCache, content_key
+
+result_cache = ResultCache(
+    max_entries=config.RESULT_CACHE_SIZE,
+    ttl=config.RESULT_CACHE_TTL,
+    db_path=config.RESULT_CACHE_DB or None,
+)
+OCR_FINGERPRINT = ocr_config_fingerprint()
+
 
+admission = AdmissionControl(config.EXTRACT_CONCURRENCY, config.EXTRACT_QUEUE)
 
-# --- Card Detection Helper ---
-from .card_detector import detect_card_type
 
-# --- Import Extractors ---
-from .aadhar_extractor import extract_fields_from_text as extract_aadhar_fields
-from .pan_extractor import extract_fields_from_text as extract_pan_fields
-from .voter_extractor import extract_fields_from_text as extract_voter_fields
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse({"detail": "Server busy, retry later"}, status_code=429,
+                        headers={"Retry-After": str(exc.retry_after)})
+
+
+async def _cached_result(key):
+    """The cached result for upload `key` (lookup counted in /metrics), or None."""
+    cached = await result_cache.get(key)
+    if cached is None:
+        metrics.CACHE_REQUESTS.inc(cache="result", result="miss")
+        return None
+    metrics.CACHE_REQUESTS.inc(cache="result", result="hit")
+    logger.info(f"⚡ Cache hit for upload {key[:12]}")
+    return {**cached, "cached": True}
+
+
+async def _record_result(key, result, timings=None):
+    """
+    Book a fresh pipeline result: worker stage timings into /metrics (and
+    `timings`), outcome counters, and the result cache when complete.
+    """
+    worker_timings = result.pop("timings", [])
+    metrics.observe_timings(worker_timings)
+    if timings is not None:
+        timings.extend(worker_timings)
+
+    if result.get("deadline_exceeded"):
+        metrics.ERRORS.inc(kind="deadline_exceeded")
+    if "error" in result:
+        metrics.ERRORS.inc(kind="ocr_failed")
+    else:
+        metrics.CARD_TYPES.inc(card_type=result.get("card_type"))
+        metrics.OCR_METHODS.inc(method=result.get("method_used"))
+        # A partial result would hide the full one until it expired.
+        if not result.get("deadline_exceeded"):
+            await result_cache.set(key, result)
+    return {**result, "cached": False}
+
+
+async def extract_document(contents: bytes, use_cache: bool = True, timings: Optional[list] = None,
+                           profile: bool = False, wait_for_slot: bool = False) -> dict:
+    """
+    Run the extraction pipeline, serving repeat uploads from the result cache.
+    The worker's stage timings go to /metrics and, if given, into `timings`.
+    `profile` samples the pipeline run and saves it to PROFILE_DIR.
+    Cache misses take an admission slot: raises Overloaded when the wait
+    queue is full, unless `wait_for_slot`. OCR stops EXTRACT_TIMEOUT
+    seconds after the slot is acquired, so queueing doesn't eat the budget.
+    """
+    key = content_key(contents, OCR_FINGERPRINT)
+    if use_cache:
+        cached = await _cached_result(key)
+        if cached is not None:
+            return cached
+
+    try:
+        async with admission.slot(wait=wait_for_slot):
+            deadline = time.time() + config.EXTRACT_TIMEOUT if config.EXTRACT_TIMEOUT > 0 else None
+            if profile:
+                result, stacks, seconds = await run_in_pool(profiler.profiled, run_extraction, contents, deadline)
+                profiler.save_profile(stacks, "extract", result.get("card_type") or "failed", seconds)
+            else:
+                result = await run_in_pool(run_extraction, contents, deadline)
+    except Overloaded:
+        raise
+    except Exception:
+        metrics.ERRORS.inc(kind="extraction_exception")
+        raise
+    return await _record_result(key, result, timings)
 
 
 @app.post("/extract")
-async def extract_fields(file: UploadFile = File(...)):
+async def extract_fields(request: Request, response: Response, file: UploadFile = File(...), no_cache: bool = False):
     contents = await file.read()
-    text, method = preprocess_image_auto(contents)
-
-    logger.info("\n===============================")
-    logger.info(f"📸 OCR Method Used: {method}")
-    logger.info("===============================")
-    logger.info(f"OCR Extracted Text (first 500 chars):\n{text[:500]}")
-    logger.info("===============================")
-
-    if not text:
-        logger.error("❌ OCR failed.")
-        return {"error": "OCR failed"}
-
-    # --- Detect card type ---
-    card_type = detect_card_type(text)
-    logger.info(f"🧩 Detected Card Type: {card_type}")
-
-    # --- Route to extractor ---
-    if card_type == "AADHAAR":
-        logger.info("➡ Using Aadhaar extractor")
-        fields = extract_aadhar_fields(text, file_bytes=contents)
-    elif card_type == "PAN":
-        logger.info("➡ Using PAN extractor")
-        fields = extract_pan_fields(text, file_bytes=contents)
-    elif card_type == "VOTER_ID":
-        logger.info("➡ Using Voter ID extractor (to be implemented)")
-        fields = extract_voter_fields(text, file_bytes=contents)
-    else:
-        logger.warning("⚠ Unknown or unsupported document type")
-        fields = {"error": "Unknown or unsupported document type"}
+    timings = []
+    result = await extract_document(contents, use_cache=not no_cache, timings=timings,
+                                    profile=profiler.should_profile(request))
+    if config.SERVER_TIMING and timings:
+        response.headers["Server-Timing"] = metrics.server_timing(timings)
+    return result
+
+
+@app.post("/extract/batch")
+async def extract_batch(
+    files: List[UploadFile] = File(...),
+    concurrency: Optional[int] = None,
+    no_cache: bool = False,
+):
+    """
+    Extract many uploads in one request. Streams one NDJSON line per document
+    in completion order, tagged with its input index; a failing document
+    yields an error line instead of failing the batch. Uncached documents
+    are sent to the workers in chunks of up to BATCH_CHUNK_SIZE, each OCR
+    deadline starting with its document.
+    """
+    limit = config.BATCH_CONCURRENCY
+    if concurrency:
+        limit = min(concurrency, limit)
+    limit = max(1, limit)
+
+    # Read everything up front; the upload files are closed once we return.
+    uploads = [(i, f.filename, await f.read()) for i, f in enumerate(files)]
+    logger.info(f"📦 Batch of {len(uploads)} document(s), concurrency {limit}")
+
+    # Cached documents are answered at once; the rest go to the workers in
+    # chunks, so the Aadhaar cards of a chunk share one NER pass.
+    cached, misses = [], []
+    for index, filename, contents in uploads:
+        key = content_key(contents, OCR_FINGERPRINT)
+        result = await _cached_result(key) if not no_cache else None
+        if result is not None:
+            cached.append({"index": index, "filename": filename, **result})
+        else:
+            misses.append((index, filename, contents, key))
+    chunk_size = max(1, min(config.BATCH_CHUNK_SIZE, math.ceil(len(misses) / limit)))
+    chunks = [misses[i:i + chunk_size] for i in range(0, len(misses), chunk_size)]
+    semaphore = asyncio.Semaphore(limit)
+
+    async def process(chunk):
+        async with semaphore:
+            try:
+                async with admission.slot(wait=True):
+                    results = await run_in_pool(run_extraction_batch, [contents for _, _, contents, _ in chunk],
+                                                config.EXTRACT_TIMEOUT if config.EXTRACT_TIMEOUT > 0 else None)
+                results = [await _record_result(key, result) for (_, _, _, key), result in zip(chunk, results)]
+            except Exception as e:
+                metrics.ERRORS.inc(kind="extraction_exception")
+                logger.exception(f"❌ Batch items {[index for index, *_ in chunk]} failed")
+                results = [{"error": f"Extraction failed: {e}"}] * len(chunk)
+        return [{"index": index, "filename": filename, **result}
+                for (index, filename, _, _), result in zip(chunk, results)]
+
+    async def stream():
+        for line in cached:
+            yield json.dumps(line) + "\n"
+        tasks = [asyncio.create_task(process(chunk)) for chunk in chunks]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                for line in await next_done:
+                    yield json.dumps(line) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+# --- Asynchronous jobs ---
+jobs = None  # JobQueue, opened in lifespan
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job(file: UploadFile = File(...), no_cache: bool = False):
+    """
+    Queue an upload for extraction and return at once. Poll GET /jobs/{job_id};
+    the result is the same body /extract would have returned.
+    """
+    job_id = await jobs.submit(await file.read(), use_cache=not no_cache)
+    return {"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = await jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return job
+
+
+@app.get("/jobs")
+async def job_stats():
+    """Job counts by status."""
+    return await jobs.stats()
 
-    logger.info("\n✅ Final Extracted Fields:")
-    for k, v in fields.items():
-        logger.info(f"   {k}: {v}")
 
-    return {
-        "method_used": method,
-        "card_type": card_type,
-        "raw_text": text,
-        "fields": fields
-    }
+@app.get("/engines")
+async def engines():
+    """OCR engine load times and memory use, as seen by one OCR worker."""
+    return await run_in_pool(engine_stats)
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return result_cache.stats()
+
+
+@app.get("/admission")
+async def admission_stats():
+    """Extraction slots in use and callers waiting for one."""
+    return admission.stats()
+
+
+# --- Profiles (FORMFILL_PROFILE_DIR) ---
+@app.get("/admin/profiles")
+async def slow_profiles(min_ms: Optional[int] = None, limit: int = 20):
+    """Most recent profiles at least `min_ms` long (default PROFILE_SLOW_MS)."""
+    if not config.PROFILE_DIR:
+        raise HTTPException(status_code=404, detail="Profiling is disabled (FORMFILL_PROFILE_DIR)")
+    min_ms = config.PROFILE_SLOW_MS if min_ms is None else min_ms
+    return {"min_ms": min_ms, "profiles": profiler.list_profiles(min_ms, limit)}
+
+
+@app.get("/admin/profiles/{name}")
+async def get_profile(name: str):
+    path = profiler.profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Profile '{name}' not found")
+    with open(path, encoding="utf-8") as f:
+        return Response(f.read(), media_type="text/plain; charset=utf-8")
 
 # --- Import Template Mapper ---
 from .template_mapper import map_fields_to_template
+from .template_registry import registry as template_registry
+
+
+@app.get("/templates")
+async def list_templates():
+    return {"templates": template_registry.list_templates()}
+
 
-from typing import Dict, Optional, Union
+FieldValues = Dict[str, Optional[Union[str, int, float]]]
 
 class MappingRequest(BaseModel):
     template: str
-    fields: Dict[str, Optional[Union[str, int, float]]]
+    fields: FieldValues
+
+class BulkMappingRequest(BaseModel):
+    template: str
+    records: List[FieldValues]
 
 # --- Final /map endpoint (only one active) ---
 @app.post("/map")
 async def map_fields(request: MappingRequest):
-    logger.info("\n===============================")
-    logger.info("🗺️  Incoming /map request")
-    logger.info(f"Template requested: {request.template}")
-    logger.info(f"Fields received: {list(request.fields.keys())}")
-    logger.info("===============================")
+    logger.info(f"🗺️ /map request for template '{request.template}' with fields {list(request.fields.keys())}")
 
     # Sanitize None → ""
     clean_fields = {k: (v if v is not None else "") for k, v in request.fields.items()}
 
-    result = map_fields_to_template(request.template, clean_fields)
+    with metrics.observe_stage("map_fields"):
+        result = map_fields_to_template(request.template, clean_fields)
 
-    logger.info(f"🧭 Mapping result for template '{request.template}':")
-    logger.info(result)
-    logger.info("===============================\n")
+    logger.debug(f"🧭 Mapping result for template '{request.template}': {result}")
 
     return result
-from fastapi.responses import FileResponse
-import os
+import gzip
+import io
+from .form_renderer import get_plan, render_form_pdf, new_document, finish_document, ZipStream
 
-from fpdf import FPDF
-from fastapi.responses import FileResponse
+render_cache = ResultCache(max_entries=config.RENDER_CACHE_SIZE, ttl=config.RENDER_CACHE_TTL)
 
-def ascii_safe(s):
-    if not isinstance(s, str):
-        s = str(s)
-    s = s.replace('—', '-')
-    return s.encode("latin1", "replace").decode("latin1")
 
 @app.post("/generate-form-pdf")
-async def generate_form_pdf(request: MappingRequest):
+async def generate_form_pdf(request: MappingRequest, http_request: Request, compress: bool = False, no_cache: bool = False):
+    """
+    Render the filled form in memory and send it back; nothing is written to
+    disk. `compress` gzips the body (Content-Encoding: gzip). Identical
+    renders (same template version and values) come from render_cache.
+    """
     template_name = request.template
     mapped_fields = request.fields
 
-    template_path = os.path.join(TEMPLATE_DIR, f"{template_name}.json")
-
-    with open(template_path, "r", encoding="utf-8") as f:
-        template = json.load(f)
+    template = template_registry.get(template_name)
+    if template is None:
+        raise HTTPException(status_code=404, detail=f"Template '{template_name}' not found")
 
     layout = template.get("layout", {})
     if not layout:
         raise HTTPException(status_code=400, detail="Template layout missing")
 
+    key = content_key(
+        json.dumps(mapped_fields, sort_keys=True, default=str).encode("utf-8"),
+        f"{template_name}:{template_registry.version(template_name)}",
+    )
+    pdf_bytes = None if no_cache else await render_cache.get(key)
+    if not no_cache:
+        metrics.CACHE_REQUESTS.inc(cache="render", result="miss" if pdf_bytes is None else "hit")
+    if pdf_bytes is None:
+        plan = get_plan(template_name, template)
+        with metrics.observe_stage("pdf_render"):
+            if profiler.should_profile(http_request):
+                pdf_bytes, stacks, seconds = await run_in_threadpool(
+                    profiler.profiled, render_form_pdf, plan, mapped_fields
+                )
+                profiler.save_profile(stacks, "pdf", template_name, seconds)
+            else:
+                pdf_bytes = await run_in_threadpool(render_form_pdf, plan, mapped_fields)
+        await render_cache.set(key, pdf_bytes)
+
+    headers = {"Content-Disposition": f'attachment; filename="{template_name}_filled.pdf"'}
+    if compress:
+        pdf_bytes = gzip.compress(pdf_bytes, compresslevel=6)
+        headers["Content-Encoding"] = "gzip"
+
+    # Response sets Content-Length from the body.
+    return Response(pdf_bytes, media_type="application/pdf", headers=headers)
+
+
+# --- Bulk form generation ---
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+def _render_plan_for(template_name):
+    template = template_registry.get(template_name) if template_name else None
+    if template is None:
+        raise HTTPException(status_code=404, detail=f"Template '{template_name}' not found")
+    if not template.get("layout"):
+        raise HTTPException(status_code=400, detail="Template layout missing")
+    return get_plan(template_name, template)
 
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-
-    # Title
-    pdf.set_font("Arial", "B", 16)
-    pdf.cell(0, 10, ascii_safe(template.get("form_name", "Government Form")), ln=True)
-    pdf.ln(8)
-
-    pdf.set_font("Arial", size=12)
-
-    for field, pos in layout.items():
-        value = mapped_fields.get(field, "")
-
-        pdf.set_xy(pos["x"], pos["y"])
-
-        # Print label
-        pdf.set_font("Arial", "B", 11)
-        pdf.cell(50, 8, ascii_safe(f"{field}:"), 0, 0)
-
-        # Print value
-        pdf.set_font("Arial", size=11)
-        pdf.cell(0, 8, ascii_safe(str(value)))
-
-
-    output_path = f"{template_name}_filled.pdf"
-    pdf.output(output_path)
 
-    return FileResponse(
-        output_path,
-        media_type="application/pdf",
-        filename=output_path
-    )
\ No newline at end of file
+def _ndjson_records(body: bytes, template_name):
+    """Yield (record number, fields, error) per NDJSON line, parsed lazily."""
+    number = 0
+    for line in io.BytesIO(body):
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            fields = MappingRequest(template=template_name, fields=json.loads(line)).fields
+        except ValidationError as e:
+            yield number, None, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            continue
+        except ValueError as e:
+            yield number, None, f"Invalid JSON: {e}"
+            continue
+        yield number, fields, None
+
+
+@app.post("/generate-form-pdf/bulk")
+async def generate_form_pdf_bulk(request: Request, template: Optional[str] = None, format: str = "pdf"):
+    """
+    Fill one template for many records. The body is either JSON
+    {"template": ..., "records": [{...}, ...]} or NDJSON with one fields
+    object per line (template in the query string). format=pdf returns one
+    multi-page PDF; format=zip streams a ZIP with one PDF per record.
+    """
+    if format not in ("pdf", "zip"):
+        raise HTTPException(status_code=400, detail="format must be 'pdf' or 'zip'")
+
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type in NDJSON_TYPES:
+        if not template:
+            raise HTTPException(status_code=422, detail="The 'template' query parameter is required for NDJSON bodies")
+        template_name = template
+        plan = _render_plan_for(template_name)
+        # The body is read up front: once a StreamingResponse starts, Starlette
+        # listens on the same channel for disconnects. Records are only
+        # parsed, validated and rendered one at a time while streaming.
+        records = _ndjson_records(await request.body(), template_name)
+    else:
+        try:
+            payload = await request.json()
+            if not isinstance(payload, dict):
+                raise ValueError('Body must be a JSON object {"template": ..., "records": [...]}')
+            bulk = BulkMappingRequest(**payload)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        template_name = bulk.template
+        plan = _render_plan_for(template_name)
+        records = ((number, fields, None) for number, fields in enumerate(bulk.records, start=1))
+
+    logger.info(f"📚 Bulk render of '{template_name}' as {format}")
+
+    if format == "pdf":
+        # One document; fpdf2 only serialises it once every page is drawn.
+        pdf = new_document()
+        pages = 0
+        errors = []
+        for number, fields, error in records:
+            if error:
+                errors.append({"record": number, "error": error})
+                continue
+            if pages >= config.BULK_PDF_MAX_PAGES:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"More than {config.BULK_PDF_MAX_PAGES} records; use format=zip",
+                )
+            with metrics.observe_stage("pdf_page"):
+                await run_in_threadpool(plan.draw_page, pdf, fields)
+            pages += 1
+        if errors:
+            raise HTTPException(status_code=422, detail=errors)
+        if not pages:
+            raise HTTPException(status_code=400, detail="No records to render")
+        with metrics.observe_stage("pdf_finish"):
+            pdf_bytes = await run_in_threadpool(finish_document, pdf)
+        logger.info(f"✅ Bulk PDF: {pages} page(s), {len(pdf_bytes)} bytes")
+        return Response(
+            pdf_bytes,
+            media_type="application/pdf",
+            headers={"Content-Disposition": f'attachment; filename="{template_name}_bulk.pdf"'},
+        )
+
+    async def stream_zip():
+        archive = ZipStream()
+        errors = []
+        count = 0
+        for number, fields, error in records:
+            if error:
+                errors.append({"record": number, "error": error})
+                continue
+            with metrics.observe_stage("pdf_render"):
+                pdf_bytes = await run_in_threadpool(render_form_pdf, plan, fields)
+            yield archive.add(f"{template_name}_{number:05d}.pdf", pdf_bytes)
+            count += 1
+        if errors:
+            # Bad records are skipped; the archive says which and why.
+            yield archive.add("errors.json", json.dumps(errors, indent=2))
+        yield archive.close()
+        logger.info(f"✅ Bulk ZIP: {count} form(s), {len(errors)} skipped record(s)")
+
+    return StreamingResponse(
+        stream_zip(),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{template_name}_forms.zip"'},
+    )
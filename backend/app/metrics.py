@@ -0,0 +1,176 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Prometheus text exposition (format 0.0.4), kept dependency-free. Metrics
+# live in the API process; OCR workers record their stage timings on the
+# DecodedDocument and ship them back with the result (observe_timings).
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_registry = []
+_lock = threading.Lock()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        for key, value in sorted(self._values.items()):
+            yield f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series = {}  # label values -> [bucket counts, sum, count]
+        _registry.append(self)
+
+    def observe(self, seconds, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with _lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[0][i] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        for key, (counts, total, count) in sorted(self._series.items()):
+            for bound, n in zip(self.buckets, counts):
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, [('le', _number(bound))])} {n}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {count}"
+
+
+def render() -> str:
+    """Every metric in Prometheus text format."""
+    with _lock:
+        lines = [line for metric in _registry for line in metric.collect()]
+    return "\n".join(lines) + "\n"
+
+
+# --- Metrics ---
+REQUEST_SECONDS = Histogram("formfill_request_seconds", "HTTP request latency.", ["method", "route", "status"])
+STAGE_SECONDS = Histogram("formfill_stage_seconds", "Time spent per pipeline stage.", ["stage"])
+OCR_CALL_SECONDS = Histogram("formfill_ocr_call_seconds", "Time per OCR engine call.", ["engine", "variant"])
+CARD_TYPES = Counter("formfill_card_type_total", "Extracted documents by detected card type.", ["card_type"])
+OCR_METHODS = Counter("formfill_ocr_method_total", "Extracted documents by winning OCR method.", ["method"])
+CACHE_REQUESTS = Counter("formfill_cache_requests_total", "Cache lookups.", ["cache", "result"])
+ERRORS = Counter("formfill_errors_total", "Failed requests and documents.", ["kind"])
+ADMISSIONS = Counter("formfill_admissions_total", "Extraction admission decisions.", ["result"])
+JOBS = Counter("formfill_jobs_total", "Extraction job events.", ["event"])
+
+
+# --- Recording ---
+def record_stage(document, stage, seconds):
+    """Note a stage duration on the document (worker side); see observe_timings."""
+    if document is not None:
+        document.timings.append({"stage": stage, "seconds": seconds})
+
+
+def record_ocr_call(document, engine, variant, seconds):
+    if document is not None:
+        document.timings.append({"engine": engine, "variant": variant, "seconds": seconds})
+
+
+@contextmanager
+def stage(document, name):
+    """Time the block as pipeline stage `name` of `document`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(document, name, time.perf_counter() - start)
+
+
+def timed_ocr(document, engine, variant, fn, *args, **kwargs):
+    """
+    Call an OCR function, recording its duration (safe from OCR threads).
+    Past the document's deadline the call is not made (DeadlineExceeded);
+    tesseract calls get the time left as their `timeout`.
+    """
+    if document is not None:
+        timeout = document.time_left()
+        if timeout is not None and engine == "tesseract":
+            kwargs["timeout"] = timeout
+    start = time.perf_counter()
+    try:
+        return fn(*args, **kwargs)
+    except TimeoutError:
+        if document is not None:
+            document.deadline_exceeded = True
+        raise
+    finally:
+        record_ocr_call(document, engine, variant, time.perf_counter() - start)
+
+
+def observe_timings(timings):
+    """Feed timings recorded by a worker into the histograms."""
+    for t in timings:
+        if "engine" in t:
+            OCR_CALL_SECONDS.observe(t["seconds"], engine=t["engine"], variant=t["variant"])
+        else:
+            STAGE_SECONDS.observe(t["seconds"], stage=t["stage"])
+
+
+@contextmanager
+def observe_stage(name):
+    """Time the block as stage `name` (API process side)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=name)
+
+
+def server_timing(timings):
+    """
+    Server-Timing header value: milliseconds per stage, in first-seen order.
+    OCR calls are summed per engine, so they can exceed wall time when the
+    calls ran in parallel.
+    """
+    totals = {}
+    for t in timings:
+        name = t.get("stage") or f"ocr-{t['engine']}"
+        totals[name] = totals.get(name, 0.0) + t["seconds"]
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in totals.items())
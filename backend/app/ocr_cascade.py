@@ -0,0 +1,132 @@
+import logging
+import re
+import time
+from concurrent.futures import as_completed
+
+from . import config
+from .metrics import timed_ocr
+from .ocr_engines import EASYOCR_AVAILABLE, get_ocr_executor, read_with_easyocr
+from .tesseract_engine import get_tesseract
+
+logger = logging.getLogger("ocr_cascade")
+
+# --- Quality score ---
+# Card numbers the text should contain, matched with whitespace removed.
+CARD_NUMBER_PATTERNS = [
+    re.compile(r'[A-Z]{5}\d{4}[A-Z]'),    # PAN
+    re.compile(r'[A-Z]{3}\d{7}'),         # EPIC
+    re.compile(r'(?<!\d)\d{12}(?!\d)'),   # Aadhaar
+]
+CARD_KEYWORDS = re.compile(
+    r'income\s*tax|permanent\s*account|election\s*commission|uidai|aadhaar|government\s*of\s*india',
+    re.IGNORECASE,
+)
+# Alphanumeric characters at which a card's text counts as complete.
+EXPECTED_LENGTH = 60
+
+
+def quality_score(text, confidence):
+    """
+    0-100: half mean word confidence, 30 for a recognizable card number
+    (10 for a card keyword instead), 20 for text length.
+    """
+    if not text:
+        return 0.0
+    compact = re.sub(r'\s+', '', text.upper())
+    if any(p.search(compact) for p in CARD_NUMBER_PATTERNS):
+        pattern_points = 30
+    elif CARD_KEYWORDS.search(text):
+        pattern_points = 10
+    else:
+        pattern_points = 0
+    length_points = 20 * min(1.0, sum(c.isalnum() for c in text) / EXPECTED_LENGTH)
+    return 0.5 * confidence + pattern_points + length_points
+
+
+# --- Tiers, cheapest first ---
+def _tesseract(document, variants, lang="eng"):
+    """Tesseract on each variant, in parallel; yields (method, text, confidence)."""
+    tesseract = get_tesseract()
+    executor = get_ocr_executor()
+    suffix = "" if lang == "eng" else f":{lang}"
+    images = {name: document.variant(name) for name in variants}
+    futures = {
+        executor.submit(timed_ocr, document, "tesseract", f"{name}{suffix}", tesseract.image_to_text_conf, img, lang=lang): name
+        for name, img in images.items()
+    }
+    for future in as_completed(futures):
+        name = futures[future]
+        try:
+            text, conf = future.result()
+        except Exception as e:
+            logger.warning(f"⚠️ OCR variant '{name}{suffix}' failed: {e}")
+            continue
+        yield f"{name}{suffix}", text, conf
+
+
+def _easyocr(document, source):
+    result = read_with_easyocr(document, source)
+    if result is not None:
+        yield ("easyocr" if source == "bgr" else f"easyocr:{source}"), *result
+
+
+TIERS = [
+    ("tesseract_gray", lambda doc: _tesseract(doc, ["gray"])),
+    ("tesseract_variants", lambda doc: _tesseract(doc, ["simple_thresh", "adaptive", "contrast"])),
+    ("tesseract_hin", lambda doc: _tesseract(doc, ["adaptive_gaussian", "sharp_adaptive"], lang="eng+hin")),
+    ("easyocr", lambda doc: _easyocr(doc, "bgr")),
+    ("easyocr_sharp", lambda doc: _easyocr(doc, "sharp_adaptive")),
+]
+EASYOCR_TIERS = ("easyocr", "easyocr_sharp")
+
+# Tier order once the card type is known (preclassify). PAN numbers and
+# Aadhaar numbers come from ROI OCR, so plain tesseract is usually enough;
+# the Voter extractor prefers EasyOCR text, so it goes first there.
+CARD_PLANS = {
+    "PAN": ("tesseract_gray", "tesseract_variants"),
+    "AADHAAR": ("tesseract_gray", "tesseract_variants", "tesseract_hin"),
+    "VOTER_ID": ("easyocr", "tesseract_gray", "tesseract_variants", "easyocr_sharp"),
+}
+
+
+def ocr_cascade(document, threshold=None, plan=None):
+    """
+    Run TIERS in order (or the tier names in `plan`, e.g. a CARD_PLANS entry)
+    until the best text so far scores `threshold` (default
+    OCR_CASCADE_THRESHOLD). Returns (text, method, score, tiers); `tiers`
+    lists every tier that ran with its time and best score.
+    Memoized per document.
+    """
+    threshold = config.OCR_CASCADE_THRESHOLD if threshold is None else threshold
+    plan = tuple(plan or (name for name, _ in TIERS))
+    return document.memo(("ocr_cascade", threshold, plan), lambda: _run(document, threshold, plan))
+
+
+def _run(document, threshold, plan):
+    runners = dict(TIERS)
+    best_text, best_method, best_score = "", "gray", 0.0
+    tiers = []
+    for tier in plan:
+        if tier in EASYOCR_TIERS and not EASYOCR_AVAILABLE:
+            continue
+        if document.expired():
+            document.deadline_exceeded = True
+            logger.warning(f"⏰ Deadline reached before {tier}; keeping '{best_method}' (quality {best_score:.1f})")
+            break
+        run = runners[tier]
+        start = time.perf_counter()
+        tier_method, tier_score = None, 0.0
+        for method, text, conf in run(document):
+            score = quality_score(text, conf)
+            logger.info(f"🔎 {tier}/{method}: quality {score:.1f} (confidence {conf:.1f})")
+            if tier_method is None or score > tier_score:
+                tier_method, tier_score = method, score
+            if score > best_score or not best_text:
+                best_text, best_method, best_score = text, method, score
+        seconds = time.perf_counter() - start
+        tiers.append({"tier": tier, "seconds": round(seconds, 3),
+                      "method": tier_method, "score": round(tier_score, 2)})
+        if best_score >= threshold:
+            logger.info(f"⏩ '{best_method}' reached quality {best_score:.1f} after {tier}, skipping costlier tiers")
+            break
+    return best_text, best_method, round(best_score, 2), tiers
@@ -0,0 +1,136 @@
+import contextvars
+import importlib.util
+import logging
+import os
+import resource
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import config
+from .metrics import timed_ocr
+from .tesseract_engine import backend_name
+
+logger = logging.getLogger("ocr_engines")
+
+# EasyOCR setup (optional). Only look the package up here: importing it
+# pulls in torch, which is deferred until a reader is actually built.
+EASYOCR_AVAILABLE = importlib.util.find_spec("easyocr") is not None
+if not EASYOCR_AVAILABLE:
+    logger.warning("⚠️ EasyOCR not available. Install with: pip install easyocr")
+
+_readers = {}
+_reader_stats = {}
+_lock = threading.Lock()
+
+_ocr_executor = None
+
+
+class _ContextThreadPool(ThreadPoolExecutor):
+    """Runs each task in a copy of the submitter's context (request id for logs)."""
+
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def get_ocr_executor():
+    """
+    Thread pool for concurrent tesseract calls within one document
+    (preprocessing variants, ROI crops). Both tesseract backends run outside
+    the GIL (a subprocess, or libtesseract releasing it).
+    """
+    global _ocr_executor
+    if _ocr_executor is None:
+        with _lock:
+            if _ocr_executor is None:
+                _ocr_executor = _ContextThreadPool(
+                    max_workers=max(1, config.OCR_VARIANT_THREADS),
+                    thread_name_prefix="ocr",
+                )
+    return _ocr_executor
+
+
+def _rss_bytes():
+    """Current resident set size of this process."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # Peak RSS (KiB on Linux) where /proc is unavailable.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _lang_key(langs):
+    return tuple(dict.fromkeys(langs or config.EASYOCR_LANGS))
+
+
+def get_easyocr_reader(langs=None):
+    """
+    Shared EasyOCR reader for a language set (defaults to EASYOCR_LANGS).
+    Each set is built once per process; returns None if EasyOCR is missing.
+    """
+    if not EASYOCR_AVAILABLE:
+        return None
+    key = _lang_key(langs)
+    reader = _readers.get(key)
+    if reader is not None:
+        return reader
+
+    with _lock:
+        if key not in _readers:
+            import easyocr
+
+            rss_before = _rss_bytes()
+            start = time.perf_counter()
+            _readers[key] = easyocr.Reader(list(key), gpu=config.EASYOCR_GPU)
+            load_seconds = time.perf_counter() - start
+            rss_delta = _rss_bytes() - rss_before
+            _reader_stats[key] = {
+                "langs": list(key),
+                "load_seconds": round(load_seconds, 3),
+                "rss_delta_mb": round(rss_delta / 2**20, 1),
+            }
+            logger.info(f"🔤 EasyOCR reader {list(key)} loaded in {load_seconds:.2f}s (+{rss_delta / 2**20:.0f} MB RSS)")
+    return _readers[key]
+
+
+def read_with_easyocr(document, source="bgr", min_conf=0.3):
+    """
+    EasyOCR lines of `document.image(source)` with confidence above `min_conf`.
+    Returns (text, mean confidence 0-100), or None if EasyOCR is missing or
+    fails. Memoized per document, so the OCR cascade and the extractors
+    share one pass.
+    """
+    def build():
+        reader = get_easyocr_reader()
+        if reader is None:
+            return None
+        try:
+            results = timed_ocr(document, "easyocr", source, reader.readtext, document.image(source))
+        except Exception as e:
+            logger.warning(f"⚠️ EasyOCR extraction failed: {e}")
+            return None
+        kept = [(text, conf) for (bbox, text, conf) in results if conf > min_conf]
+        score = 100 * sum(conf for _, conf in kept) / len(kept) if kept else 0.0
+        return "\n".join(text for text, _ in kept), score
+
+    if not EASYOCR_AVAILABLE:
+        return None
+    return document.memo(("easyocr", source, min_conf), build)
+
+
+def warm_readers(lang_sets=None):
+    """Build readers ahead of the first request (default: the shared EASYOCR_LANGS set)."""
+    for langs in lang_sets or [config.EASYOCR_LANGS]:
+        get_easyocr_reader(langs)
+
+
+def engine_stats():
+    """Load time and memory use of the readers resident in this process."""
+    return {
+        "pid": os.getpid(),
+        "easyocr_available": EASYOCR_AVAILABLE,
+        "tesseract_backend": backend_name(),
+        "readers": list(_reader_stats.values()),
+        "rss_mb": round(_rss_bytes() / 2**20, 1),
+    }
@@ -1,17 +1,94 @@
 import re
 import logging
-from rich.logging import RichHandler
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(message)s",
-    datefmt="[%X]",
-    handlers=[RichHandler(rich_tracebacks=True)]
-)
+from .field_rules import FieldRules, Keywords, clean_ocr_text
+from .roi_ocr import ocr_regions
+
 logger = logging.getLogger("pan_extractor")
 
+# --- Field rules (compiled once at import) ---
+PAN_NOISE_WORDS = ("NAME", "ACCOUNT", "INCOME", "DEPARTMENT", "GOVT",
+                   "GOVERNMENT", "INDIA", "PERMANENT", "SIGNATURE")
+
+PAN_RULES = FieldRules(
+    "PAN",
+    labels={
+        "name": (r'\bName\b', re.IGNORECASE),
+        "father": Keywords("father"),
+    },
+    patterns={
+        "pan_number": r'([A-Z]{5}[0-9]{4}[A-Z])',
+        "date": r'(\d{2}[\/\-]\d{2}[\/\-]\d{4})',
+        "upper_name": r'^[A-Z\s]{3,}$',
+        "upper_words": r'^[A-Z]{1,}(\s+[A-Z]+)*$',
+        # Candidate lines containing any noise word are not names.
+        "noise": r'|'.join(PAN_NOISE_WORDS),
+    },
+    cleaners={
+        # OCR bullet prefixes like "a " or "* "
+        "prefix": [(r'^[a-z]\s+', ''), (r'^\*\s+', '')],
+        # ...plus trailing numbers and trailing lowercase noise like "ose"
+        "fallback_line": [(r'^[a-z]\s+', ''), (r'^\*\s+', ''), (r'\s+\d+\s*$', ''), (r'\s+[a-z]+\s*$', '')],
+    },
+)
+R = PAN_RULES
+
+
+def _name_below(lines, i, upper=False, exclude=("NAME",)):
+    """First name-like line among the two lines after a label (uppercased if `upper`)."""
+    for j in range(i + 1, min(i + 3, len(lines))):
+        candidate = R.clean("prefix", lines[j].strip())
+        if upper:
+            candidate = candidate.upper()
+        if R.match("upper_name", candidate) and not any(word in candidate for word in exclude):
+            return candidate
+    return None
+
+
+def _uppercase_name_candidates(lines):
+    """Fallback: every all-caps line that isn't card boilerplate."""
+    candidates = []
+    for line in lines:
+        cleaned_line = R.clean("fallback_line", line)
+        # Allow single-letter initials; minimum length 3 total, no noise keywords
+        if (R.match("upper_words", cleaned_line)
+                and not R.search("noise", cleaned_line)
+                and len(cleaned_line) >= 3):
+            candidates.append(cleaned_line)
+            logger.debug(f"🔍 Candidate name found: '{cleaned_line}'")
+    return candidates
+
+
+def _clean_lines(text):
+    cleaned = clean_ocr_text(text)
+    return [line.strip() for line in cleaned.split('\n') if line.strip()]
+
+
+def _labelled_names(lines):
+    """Name and Father's Name from the lines below their labels; (None, None) if absent."""
+    scan = R.scan(lines)
+    name_line, fname_line = None, None
+
+    # 1️⃣ "Name" label (but not "Father's Name"): last matching label wins
+    for i, _ in scan.hits("name"):
+        if scan.has("father", i):
+            continue
+        candidate = _name_below(lines, i, exclude=("NAME", "GOVT", "INDIA"))
+        if candidate:
+            name_line = candidate
+            logger.debug(f"✅ Detected Name line: '{candidate}'")
+
+    # 2️⃣ "Father's Name": also accept lowercase OCR, normalised to uppercase
+    for i, _ in scan.hits("father"):
+        candidate = _name_below(lines, i, upper=True)
+        if candidate:
+            fname_line = candidate
+            logger.debug(f"✅ Detected Father's Name line: '{fname_line}'")
+
+    return name_line, fname_line
 
-def extract_fields_from_text(text: str, file_bytes=None):
+
+def extract_fields_from_text(text: str, document=None):
     result = {
         "Name": None,
         "Father Name": None,
@@ -22,110 +99,49 @@ def extract_fields_from_text(text: str, file_bytes=None):
     }
 
     # --- Clean up text ---
-    cleaned = re.sub(r'[^A-Za-z0-9\n:/\-]', ' ', text)
-    cleaned = re.sub(r'[ \t]+', ' ', cleaned)
-    cleaned = re.sub(r'\n+', '\n', cleaned).strip()
-    lines = [line.strip() for line in cleaned.split('\n') if line.strip()]
+    lines = _clean_lines(text)
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("=== OCR CLEANED LINES ===\n" + "\n".join(f"{i}: {line}" for i, line in enumerate(lines)))
 
-    logger.info("\n=== OCR CLEANED LINES ===")
-    for i, line in enumerate(lines):
-        logger.info(f"{i}: {line}")
+    # Number strips and the name block, OCR'd on their own crops
+    roi = ocr_regions(document, "PAN") if document is not None else {}
 
-    # --- PAN Number ---
-    pan_match = re.search(r'([A-Z]{5}[0-9]{4}[A-Z])', text.replace(" ", "").upper())
-    if pan_match:
-        result["PAN"] = pan_match.group(1).upper()
-        logger.info(f"✅ PAN Number Detected: {result['PAN']}")
+    # --- PAN Number (whitelisted ROI text first, then the full frame) ---
+    for source in (roi.get("pan_number_upper"), roi.get("pan_number_lower"), text):
+        pan_match = R.search("pan_number", (source or "").replace(" ", "").upper())
+        if pan_match:
+            result["PAN"] = pan_match.group(1).upper()
+            logger.debug(f"✅ PAN Number Detected: {result['PAN']}")
+            break
 
     # --- DOB ---
-    dob_match = re.search(r'(\d{2}[\/\-]\d{2}[\/\-]\d{4})', text)
+    dob_match = R.search("date", text)
     if dob_match:
         result["DOB"] = dob_match.group(1)
-        logger.info(f"✅ DOB Detected: {result['DOB']}")
+        logger.debug(f"✅ DOB Detected: {result['DOB']}")
 
-    # --- Extract Name and Father's Name ---
-    name_line, fname_line = None, None
+    # --- Extract Name and Father's Name (one pass over the lines) ---
+    name_line, fname_line = _labelled_names(lines)
 
-    for i, line in enumerate(lines):
-        # 1️⃣ Find "Name" label (but not "Father's Name")
-        if re.search(r'\bName\b', line, re.IGNORECASE) and not re.search(r"Father", line, re.IGNORECASE):
-            for j in range(i+1, min(i+3, len(lines))):
-                candidate = lines[j].strip()
-                # Clean prefixes like "a " or "* "
-                candidate_cleaned = re.sub(r'^[a-z]\s+', '', candidate)
-                candidate_cleaned = re.sub(r'^\*\s+', '', candidate_cleaned)
-                
-                # Must be mostly uppercase alphabetic (allow spaces) AND not GOVT/INDIA
-                if (re.match(r'^[A-Z\s]{3,}$', candidate_cleaned) 
-                    and "NAME" not in candidate_cleaned
-                    and "GOVT" not in candidate_cleaned
-                    and "INDIA" not in candidate_cleaned):
-                    name_line = candidate_cleaned
-                    logger.info(f"✅ Detected Name line: '{candidate_cleaned}'")
-                    break
-
-        # 2️⃣ Find "Father's Name"
-        if re.search(r"Father", line, re.IGNORECASE):
-            for j in range(i+1, min(i+3, len(lines))):
-                candidate = lines[j].strip()
-                # Clean prefixes
-                candidate_cleaned = re.sub(r'^[a-z]\s+', '', candidate)
-                candidate_cleaned = re.sub(r'^\*\s+', '', candidate_cleaned)
-                
-                # 🆕 FIX: Also check if line has mostly alphabetic chars (even if lowercase)
-                # Convert to uppercase for pattern matching
-                candidate_upper = candidate_cleaned.upper()
-                
-                # Check if it matches name pattern after uppercase conversion
-                if (re.match(r'^[A-Z\s]{3,}$', candidate_upper) 
-                    and "NAME" not in candidate_upper
-                    and len(candidate_cleaned.split()) >= 1):  # At least one word
-                    # Use the uppercase version as father's name
-                    fname_line = candidate_upper
-                    logger.info(f"✅ Detected Father's Name line: '{fname_line}'")
-                    break
+    # The name block crop often reads labels the full frame missed
+    if (not name_line or not fname_line) and roi.get("name_block"):
+        roi_name, roi_fname = _labelled_names(_clean_lines(roi["name_block"]))
+        name_line = name_line or roi_name
+        fname_line = fname_line or roi_fname
 
     # --- Fallback Logic ---
     if not name_line or not fname_line:
-        uppercase_name_candidates = []
-        
-        for i, line in enumerate(lines):
-            # Clean prefixes
-            cleaned_line = re.sub(r'^[a-z]\s+', '', line)
-            cleaned_line = re.sub(r'^\*\s+', '', cleaned_line)
-            
-            # Remove trailing numbers and spaces
-            cleaned_line = re.sub(r'\s+\d+\s*$', '', cleaned_line).strip()
-            
-            # Remove trailing lowercase words (OCR noise like "ose")
-            cleaned_line = re.sub(r'\s+[a-z]+\s*$', '', cleaned_line).strip()
-            
-            # Allow single-letter initials
-            pattern_match = re.match(r'^[A-Z]{1,}(\s+[A-Z]+)*$', cleaned_line)
-            
-            # Match: All caps, minimum length 3 total, no noise keywords
-            if (pattern_match
-                and "NAME" not in cleaned_line 
-                and "ACCOUNT" not in cleaned_line
-                and "INCOME" not in cleaned_line
-                and "DEPARTMENT" not in cleaned_line
-                and "GOVT" not in cleaned_line
-                and "GOVERNMENT" not in cleaned_line
-                and "INDIA" not in cleaned_line
-                and "PERMANENT" not in cleaned_line
-                and "SIGNATURE" not in cleaned_line
-                and len(cleaned_line) >= 3):
-                uppercase_name_candidates.append(cleaned_line)
-                logger.info(f"🔍 Candidate name found: '{cleaned_line}'")
+        uppercase_name_candidates = _uppercase_name_candidates(lines)
 
         # Assign first candidate to Name, second to Father's Name
         if not name_line and len(uppercase_name_candidates) >= 1:
             name_line = uppercase_name_candidates[0]
-            logger.info(f"⚙ Fallback Name Detected: '{name_line}'")
+            logger.debug(f"⚙ Fallback Name Detected: '{name_line}'")
         
         if not fname_line and len(uppercase_name_candidates) >= 2:
             fname_line = uppercase_name_candidates[1]
-            logger.info(f"⚙ Fallback Father's Name Detected: '{fname_line}'")
+            logger.debug(f"⚙ Fallback Father's Name Detected: '{fname_line}'")
         
         # Only combine if BOTH are short single-word or initials
         if len(uppercase_name_candidates) >= 2:
@@ -142,7 +158,7 @@ def extract_fields_from_text(text: str, file_bytes=None):
             if first_is_short or first_is_initial:
                 if len(second.split()) <= 2:
                     combined_name = f"{first} {second}"
-                    logger.info(f"💡 Combining short lines into full name: '{combined_name}'")
+                    logger.debug(f"💡 Combining short lines into full name: '{combined_name}'")
                     name_line = combined_name
                     fname_line = None
                     logger.info(f"⚙ Combined name, no father name available")
@@ -151,8 +167,8 @@ def extract_fields_from_text(text: str, file_bytes=None):
     result["Name"] = name_line
     result["Father Name"] = fname_line
 
-    logger.info("\n=== FINAL EXTRACTED FIELDS ===")
-    for k, v in result.items():
-        logger.info(f"{k}: {v}")
+    logger.info(f"✅ PAN fields found: {[k for k, v in result.items() if v]}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("=== FINAL EXTRACTED FIELDS ===\n" + "\n".join(f"{k}: {v}" for k, v in result.items()))
 
     return result
\ No newline at end of file
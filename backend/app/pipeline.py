@@ -0,0 +1,321 @@
+import json
+import os
+import time
+import logging
+from concurrent.futures import as_completed
+from typing import Optional
+
+from . import config
+from .document import DecodedDocument
+from .ocr_engines import get_ocr_executor, EASYOCR_AVAILABLE
+from .tesseract_engine import get_tesseract, backend_name
+from .ocr_cascade import ocr_cascade, CARD_PLANS
+from .preclassify import preclassify
+from .metrics import stage, timed_ocr
+from .logging_config import setup_logging
+from .card_detector import detect_card_type
+from .aadhar_extractor import extract_fields_from_text as extract_aadhar_fields
+from .aadhar_extractor import extract_fields_batch as extract_aadhar_fields_batch
+from .pan_extractor import extract_fields_from_text as extract_pan_fields
+from .voter_extractor import extract_fields_from_text as extract_voter_fields
+
+logger = logging.getLogger("pipeline")
+
+
+# Part of the result-cache key; bump to invalidate cached /extract results.
+PIPELINE_VERSION = 6
+
+# --- Image preprocessing helper ---
+PREPROCESS_VARIANTS = ("gray", "simple_thresh", "adaptive", "contrast")
+
+
+def ocr_with_confidence(img, timeout=None):
+    """
+    OCR an image with tesseract's per-word data.
+    Returns the text (line breaks preserved) and the mean word confidence (0-100).
+    """
+    return get_tesseract().image_to_text_conf(img, timeout=timeout)
+
+
+def _search_longest(methods, document=None):
+    best_text = ""
+    best_method = "gray"
+
+    for name, img_proc in methods.items():
+        try:
+            text = timed_ocr(document, "tesseract", name, get_tesseract().image_to_string, img_proc)
+            if len(text) > len(best_text):
+                best_text = text
+                best_method = name
+        except Exception:
+            pass
+
+    return best_text, best_method, None
+
+
+def _search_by_confidence(methods, threshold, document=None):
+    executor = get_ocr_executor()
+    futures = {
+        executor.submit(timed_ocr, document, "tesseract", name, ocr_with_confidence, img): name
+        for name, img in methods.items()
+    }
+
+    best_text, best_method, best_score = "", "gray", 0.0
+    try:
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                text, score = future.result()
+            except Exception as e:
+                logger.warning(f"⚠️ OCR variant '{name}' failed: {e}")
+                continue
+
+            logger.info(f"🔎 Variant {name}: confidence {score:.1f}")
+            if score > best_score or not best_text:
+                best_text, best_method, best_score = text, name, score
+
+            if score >= threshold:
+                logger.info(f"⏩ '{name}' passed threshold {threshold:.0f}, skipping remaining variants")
+                break
+    finally:
+        # Drops variants still queued; one already inside tesseract finishes in the background.
+        for future in futures:
+            future.cancel()
+
+    return best_text, best_method, round(best_score, 2)
+
+
+def preprocess_image_auto(document, mode=None):
+    """
+    Try multiple preprocessing methods and return the best OCR text.
+    Returns (text, method, score); score is the mean word confidence of the
+    winning variant in "confidence" mode and None in "longest" mode.
+    """
+    methods = {name: document.variant(name) for name in PREPROCESS_VARIANTS}
+
+    mode = mode or config.OCR_SEARCH_MODE
+    if mode == "confidence":
+        return _search_by_confidence(methods, config.OCR_CONFIDENCE_THRESHOLD, document)
+    return _search_longest(methods, document)
+
+
+def ocr_config_fingerprint() -> str:
+    """
+    Everything that changes what run_extraction returns for the same bytes.
+    Bump PIPELINE_VERSION when preprocessing or extraction logic changes.
+    """
+    return json.dumps({
+        "version": PIPELINE_VERSION,
+        "variants": PREPROCESS_VARIANTS,
+        "search_mode": config.OCR_SEARCH_MODE,
+        "confidence_threshold": config.OCR_CONFIDENCE_THRESHOLD,
+        "cascade_threshold": config.OCR_CASCADE_THRESHOLD,
+        "preclassify": [config.OCR_PRECLASSIFY, config.OCR_PRECLASSIFY_TEXT_HEIGHT],
+        "easyocr": EASYOCR_AVAILABLE,
+        "tesseract_backend": backend_name(),
+        "normalization": [config.OCR_TARGET_TEXT_HEIGHT, config.OCR_MIN_TEXT_HEIGHT,
+                          config.OCR_MAX_TEXT_HEIGHT, config.OCR_MAX_SIDE, config.OCR_DECODE_MIN_SIDE],
+    }, sort_keys=True)
+
+
+# --- Worker process setup ---
+_worker_models = {}
+
+
+def preload_models():
+    """Load spaCy and the shared EasyOCR readers now; returns load time per model."""
+    from .aadhar_extractor import get_nlp
+    from .ocr_engines import warm_readers, EASYOCR_AVAILABLE
+
+    timings = {}
+    start = time.perf_counter()
+    get_nlp()
+    timings["spacy"] = round(time.perf_counter() - start, 3)
+    if EASYOCR_AVAILABLE:
+        start = time.perf_counter()
+        warm_readers()
+        timings["easyocr"] = round(time.perf_counter() - start, 3)
+    return timings
+
+
+def init_worker():
+    """
+    Pool initializer. In preload mode the heavy models are loaded here, once
+    per worker process, so no request routed to the worker pays for them.
+    """
+    global _worker_models
+    setup_logging()
+    if config.STARTUP_MODE == "preload":
+        _worker_models = preload_models()
+        logger.info(f"🔧 OCR worker {os.getpid()} ready (models loaded: {_worker_models})")
+
+
+def worker_status():
+    """Cheap task used to confirm a worker has finished its initializer."""
+    return {"pid": os.getpid(), "models": _worker_models}
+
+
+# --- Full extraction pipeline (runs inside a worker) ---
+def run_extraction(contents: bytes, deadline: Optional[float] = None) -> dict:
+    """
+    Decode → OCR → classify → extract for one uploaded image.
+    The upload is decoded once; every stage shares the same DecodedDocument.
+    OCR calls stop at `deadline` (a time.time() value); the result is then
+    built from the text read so far and flagged "deadline_exceeded".
+    Blocking; meant to be executed in the OCR worker pool.
+    """
+    document, result = _read_document(contents, deadline)
+    if document is None:
+        return result
+    return _with_fields(document, result, _extract(document, result["card_type"], result["raw_text"]))
+
+
+def run_extraction_batch(uploads, timeout: Optional[float] = None) -> list:
+    """
+    run_extraction for several uploads in one worker call: each is read in
+    turn, with its own deadline `timeout` seconds after it starts. The
+    Aadhaar cards among them are then extracted together, so their spaCy
+    NER fallback is a single nlp.pipe() pass. Results keep the input order;
+    a document that raises gets an error result instead of failing the rest.
+    """
+    read = []
+    for contents in uploads:
+        try:
+            read.append(_read_document(contents, time.time() + timeout if timeout else None))
+        except Exception as e:
+            logger.exception("❌ Batch document failed")
+            read.append((None, {"error": f"Extraction failed: {e}"}))
+    results = [result for _, result in read]
+
+    aadhaar = [i for i, (document, result) in enumerate(read)
+               if document is not None and result["card_type"] == "AADHAAR"]
+    if aadhaar:
+        logger.info(f"➡ Using Aadhaar extractor for {len(aadhaar)} document(s)")
+        start = time.perf_counter()
+        try:
+            batch = extract_aadhar_fields_batch([read[i][1]["raw_text"] for i in aadhaar],
+                                                [read[i][0] for i in aadhaar])
+        except Exception as e:
+            logger.exception("❌ Aadhaar batch extraction failed")
+            batch = [e] * len(aadhaar)
+        seconds = (time.perf_counter() - start) / len(aadhaar)
+        for i, fields in zip(aadhaar, batch):
+            document = read[i][0]
+            document.timings.append({"stage": "extract_aadhaar", "seconds": seconds})
+            results[i] = (_with_fields(document, results[i], fields) if isinstance(fields, dict)
+                          else {"error": f"Extraction failed: {fields}"})
+
+    for i, (document, result) in enumerate(read):
+        if document is None or i in aadhaar:
+            continue
+        try:
+            results[i] = _with_fields(document, result, _extract(document, result["card_type"], result["raw_text"]))
+        except Exception as e:
+            logger.exception("❌ Batch document failed")
+            results[i] = {"error": f"Extraction failed: {e}"}
+    return results
+
+
+def _read_document(contents, deadline):
+    """
+    Decode → OCR → classify. Returns (document, result) with everything but
+    the fields, or (None, error result) when there is no text to extract.
+    """
+    start = time.perf_counter()
+    document = DecodedDocument.from_bytes(contents, deadline=deadline)
+    decode_timing = {"stage": "decode", "seconds": time.perf_counter() - start}
+    if document is None:
+        logger.error("❌ Image decode failed")
+        return None, {"error": "OCR failed", "timings": [decode_timing]}
+    document.timings.append(decode_timing)
+
+    # --- Normalize resolution (glyph height into the OCR range) ---
+    with stage(document, "normalize"):
+        document.normalize_resolution()
+    logger.info(f"📐 Working at {document.width}x{document.height} "
+                f"(scale {document.scale:.3f}, text height {document.text_height})")
+
+    # --- Pre-classify on a small image, then OCR with the card's plan ---
+    card_type = None
+    if config.OCR_SEARCH_MODE == "cascade":
+        tiers = []
+        pre_text = ""
+        if config.OCR_PRECLASSIFY:
+            with stage(document, "preclassify"):
+                card_type, pre_text, pre_tier = preclassify(document)
+            tiers.append(pre_tier)
+        with stage(document, "ocr"):
+            text, method, score, cascade_tiers = ocr_cascade(document, plan=CARD_PLANS.get(card_type))
+        tiers += cascade_tiers
+        if not text and pre_text.strip():
+            # Typically the deadline passed before any tier finished: the
+            # small pre-classification read is the best partial text there is.
+            logger.warning("⚠️ Cascade read no text; falling back to the pre-classification text")
+            text, method, score = pre_text, "preclassify", None
+    else:
+        start = time.perf_counter()
+        text, method, score = preprocess_image_auto(document)
+        seconds = time.perf_counter() - start
+        document.timings.append({"stage": "ocr", "seconds": seconds})
+        tiers = [{"tier": config.OCR_SEARCH_MODE, "seconds": round(seconds, 3),
+                  "method": method, "score": score}]
+
+    logger.info(f"📸 OCR Method Used: {method} (confidence: {score}, {len(text or '')} chars)")
+    logger.debug(f"OCR Extracted Text (first 500 chars):\n{(text or '')[:500]}")
+
+    if not text:
+        if document.deadline_exceeded:
+            logger.error("❌ OCR ran out of time.")
+            return None, {"error": "OCR deadline exceeded", "deadline_exceeded": True, "timings": document.timings}
+        logger.error("❌ OCR failed.")
+        return None, {"error": "OCR failed", "timings": document.timings}
+
+    # --- Detect card type (unless pre-classification was sure) ---
+    if card_type is None:
+        with stage(document, "detect_card_type"):
+            card_type = detect_card_type(text)
+    logger.info(f"🧩 Detected Card Type: {card_type}")
+
+    return document, {
+        "method_used": method,
+        "ocr_score": score,
+        "ocr_tiers": tiers,
+        "card_type": card_type,
+        "scale": round(document.scale, 3),
+        "raw_text": text,
+    }
+
+
+def _extract(document, card_type, text):
+    """Route the OCR text to the card type's field extractor."""
+    if card_type == "AADHAAR":
+        logger.info("➡ Using Aadhaar extractor")
+        with stage(document, "extract_aadhaar"):
+            fields = extract_aadhar_fields(text, document=document)
+    elif card_type == "PAN":
+        logger.info("➡ Using PAN extractor")
+        with stage(document, "extract_pan"):
+            fields = extract_pan_fields(text, document=document)
+    elif card_type == "VOTER_ID":
+        logger.info("➡ Using Voter ID extractor (to be implemented)")
+        with stage(document, "extract_voter_id"):
+            fields = extract_voter_fields(text, document=document)
+    else:
+        logger.warning("⚠ Unknown or unsupported document type")
+        fields = {"error": "Unknown or unsupported document type"}
+    return fields
+
+
+def _with_fields(document, result, fields):
+    """The full result: `result` plus the fields, deadline flag and timings."""
+    logger.info(f"✅ Extracted fields: {[k for k, v in fields.items() if v]}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Final Extracted Fields:\n" + "\n".join(f"   {k}: {v}" for k, v in fields.items()))
+
+    return {
+        **result,
+        "fields": fields,
+        "deadline_exceeded": document.deadline_exceeded,
+        # Popped by the API process into /metrics (and Server-Timing).
+        "timings": document.timings,
+    }
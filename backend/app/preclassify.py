@@ -0,0 +1,68 @@
+import logging
+import re
+import time
+
+import cv2
+
+from . import config
+from .metrics import timed_ocr
+from .tesseract_engine import get_tesseract
+
+logger = logging.getLogger("preclassify")
+
+# Sparse text: finds the scattered header words of a card in any order.
+PRECLASSIFY_PSM = 11
+
+# Header words (and number formats) that only one card type prints.
+CARD_MARKERS = {
+    "PAN": [
+        re.compile(r'income\s*tax', re.IGNORECASE),
+        re.compile(r'permanent\s*account', re.IGNORECASE),
+        re.compile(r'\b[A-Z]{5}\d{4}[A-Z]\b'),
+    ],
+    "VOTER_ID": [
+        re.compile(r'election\s*commission', re.IGNORECASE),
+        re.compile(r'\belector', re.IGNORECASE),
+        re.compile(r'\bepic\b', re.IGNORECASE),
+        re.compile(r'निर्वाचन'),
+    ],
+    "AADHAAR": [
+        re.compile(r'\buidai\b', re.IGNORECASE),
+        re.compile(r'\baad+haar\b', re.IGNORECASE),
+        re.compile(r'unique\s*identification', re.IGNORECASE),
+        re.compile(r'आधार'),
+        re.compile(r'\b\d{4}\s\d{4}\s\d{4}\b'),
+    ],
+}
+
+
+def _small_image(document):
+    """Gray image scaled down so text is about OCR_PRECLASSIFY_TEXT_HEIGHT px tall."""
+    scale = 1.0
+    if document.text_height:
+        scale = min(1.0, round(config.OCR_PRECLASSIFY_TEXT_HEIGHT / document.text_height, 2))
+    return document.resize(scale, source="gray", interpolation=cv2.INTER_AREA)
+
+
+def preclassify(document):
+    """
+    One fast tesseract pass over a downscaled image, looking for card markers.
+    Returns (card type or None when unsure, the text read, tier record for
+    "ocr_tiers"). Unsure means no markers, or markers of more than one card
+    type. The text is kept as a last resort when the cascade reads nothing.
+    """
+    start = time.perf_counter()
+    try:
+        text = timed_ocr(document, "tesseract", "preclassify",
+                         get_tesseract().image_to_string, _small_image(document), psm=PRECLASSIFY_PSM)
+    except Exception as e:
+        logger.warning(f"⚠️ Pre-classification OCR failed: {e}")
+        text = ""
+
+    hits = {card: sum(1 for p in markers if p.search(text)) for card, markers in CARD_MARKERS.items()}
+    matched = [card for card, n in hits.items() if n]
+    card_type = matched[0] if len(matched) == 1 else None
+
+    seconds = time.perf_counter() - start
+    logger.info(f"🏷️ Pre-classified as {card_type or 'unsure'} in {seconds:.2f}s (marker hits: {hits})")
+    return card_type, text, {"tier": "preclassify", "seconds": round(seconds, 3), "card_type": card_type}
@@ -0,0 +1,152 @@
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from . import config
+
+logger = logging.getLogger("profiler")
+
+PROFILE_HEADER = "x-formfill-profile"
+# Pipeline work fans out to the shared OCR thread pool (see get_ocr_executor).
+OCR_THREAD_PREFIX = "ocr"
+_NAME = re.compile(r'^(?P<at>\d{8}T\d{6})-(?P<endpoint>[a-z]+)-(?P<label>[\w-]+)-(?P<ms>\d+)ms\.collapsed$')
+
+
+def should_profile(request) -> bool:
+    """
+    Profile this request? Only when PROFILE_DIR is set, and then for the
+    opt-in header or a PROFILE_SAMPLE_RATE fraction of requests.
+    """
+    if not config.PROFILE_DIR:
+        return False
+    if request.headers.get(PROFILE_HEADER) == "1":
+        return True
+    return config.PROFILE_SAMPLE_RATE > 0 and random.random() < config.PROFILE_SAMPLE_RATE
+
+
+class StackSampler:
+    """
+    Wall-clock sampling profiler: a thread that snapshots the stacks of the
+    calling thread (and the OCR pool threads) every `interval` seconds via
+    sys._current_frames(). Nothing is hooked into the profiled code itself.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.target = threading.get_ident()
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def _targets(self):
+        idents = {self.target}
+        for thread in threading.enumerate():
+            if thread.name.startswith(OCR_THREAD_PREFIX):
+                idents.add(thread.ident)
+        return idents
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            targets = self._targets()
+            for ident, frame in sys._current_frames().items():
+                if ident not in targets:
+                    continue
+                if ident != self.target and frame.f_code.co_name == "_worker":
+                    continue  # idle pool thread waiting for work
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(names))] += 1
+            self.samples += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed format ("a;b;c count"), for flamegraph.pl / speedscope."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def profiled(fn, *args):
+    """
+    Run fn(*args) under a StackSampler. Returns (result, collapsed stacks,
+    seconds). Top-level so it can be sent to the OCR process pool.
+    """
+    start = time.perf_counter()
+    with StackSampler(config.PROFILE_INTERVAL_MS / 1000) as sampler:
+        result = fn(*args)
+    return result, sampler.collapsed(), time.perf_counter() - start
+
+
+# --- Profile files ---
+def _slug(value):
+    return re.sub(r'[^A-Za-z0-9]+', '-', str(value or "none")).strip("-").lower() or "none"
+
+
+def save_profile(stacks, endpoint, label, seconds):
+    """
+    Write a profile to PROFILE_DIR as <time>-<endpoint>-<label>-<ms>ms.collapsed;
+    `endpoint` is a short lowercase word ("extract", "pdf").
+    """
+    os.makedirs(config.PROFILE_DIR, exist_ok=True)
+    name = f"{time.strftime('%Y%m%dT%H%M%S')}-{_slug(endpoint)}-{_slug(label)}-{round(seconds * 1000)}ms.collapsed"
+    path = os.path.join(config.PROFILE_DIR, name)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(stacks)
+    logger.info(f"🔬 Profile {name} ({seconds:.2f}s)")
+    _prune()
+    return name
+
+
+def _prune():
+    """Keep the newest PROFILE_KEEP files (0 = keep everything)."""
+    if config.PROFILE_KEEP <= 0:
+        return
+    names = sorted(n for n in os.listdir(config.PROFILE_DIR) if _NAME.match(n))
+    for name in names[:-config.PROFILE_KEEP]:
+        try:
+            os.remove(os.path.join(config.PROFILE_DIR, name))
+        except OSError:
+            pass
+
+
+def list_profiles(min_ms=0, limit=20):
+    """Newest profiles taking at least `min_ms`, as dicts parsed from the file names."""
+    if not config.PROFILE_DIR or not os.path.isdir(config.PROFILE_DIR):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(config.PROFILE_DIR), reverse=True):
+        match = _NAME.match(name)
+        if not match or int(match["ms"]) < min_ms:
+            continue
+        profiles.append({
+            "name": name,
+            "recorded_at": match["at"],
+            "endpoint": match["endpoint"],
+            "label": match["label"],
+            "duration_ms": int(match["ms"]),
+        })
+        if len(profiles) >= limit:
+            break
+    return profiles
+
+
+def profile_path(name):
+    """Path of a listed profile, or None (also for anything that isn't a profile name)."""
+    if not config.PROFILE_DIR or not _NAME.match(name or ""):
+        return None
+    path = os.path.join(config.PROFILE_DIR, name)
+    return path if os.path.isfile(path) else None
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger("result_cache")
+
+
+def content_key(data: bytes, fingerprint: str = "") -> str:
+    """Content address of an upload; `fingerprint` ties it to the config that produced the result."""
+    h = hashlib.sha256()
+    h.update(fingerprint.encode("utf-8"))
+    h.update(b"\0")
+    h.update(data)
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    Bounded LRU cache with a TTL, optionally backed by a SQLite file so
+    entries survive restarts. Disk entries hold JSON-serialisable values.
+    get() and set() are coroutines: the LRU is used inline, the disk tier
+    (query, commit, JSON) runs in a worker thread, off the event loop.
+    """
+
+    def __init__(self, max_entries=256, ttl=3600, db_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()  # LRU and counters
+        self._db_lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM results WHERE expires_at < ?", (time.time(),))
+            self._db.commit()
+            logger.info(f"💾 Result cache disk tier: {db_path}")
+
+    async def get(self, key):
+        value = self._get_memory(key)
+        if value is None and self._db is not None:
+            value = await run_in_threadpool(self._get_disk, key)
+        if value is None:
+            with self._lock:
+                self.misses += 1
+        return value
+
+    async def set(self, key, value):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._remember(key, value, expires_at)
+        if self._db is not None:
+            await run_in_threadpool(self._set_disk, key, value, expires_at)
+
+    def _get_memory(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at >= now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+        return None
+
+    def _get_disk(self, key):
+        with self._db_lock:
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                "SELECT value, expires_at FROM results WHERE key = ?", (key,)
+            ).fetchone()
+        if not row or row[1] < time.time():
+            return None
+        value = json.loads(row[0])
+        with self._lock:
+            self._remember(key, value, row[1])
+            self.hits += 1
+            self.disk_hits += 1
+        return value
+
+    def _set_disk(self, key, value, expires_at):
+        data = json.dumps(value)
+        with self._db_lock:
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, data, expires_at),
+                )
+                self._db.commit()
+
+    def _remember(self, key, value, expires_at):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "disk_tier": self._db is not None,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+    def close(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
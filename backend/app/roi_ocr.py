@@ -0,0 +1,101 @@
+import logging
+import string
+from concurrent.futures import as_completed
+
+import cv2
+
+from .metrics import timed_ocr
+from .ocr_engines import get_ocr_executor
+from .tesseract_engine import get_tesseract
+
+logger = logging.getLogger("roi_ocr")
+
+DIGITS = string.digits
+UPPER_ALNUM = string.ascii_uppercase + string.digits
+
+
+# --- Crop preparation ---
+def _otsu(crop):
+    return cv2.threshold(crop, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+
+
+def _contrast_otsu(crop):
+    """Contrast boost before Otsu, for faint print on patterned backgrounds."""
+    return _otsu(cv2.convertScaleAbs(crop, alpha=2, beta=0))
+
+
+class Region:
+    """
+    One field area of a card, as fractions of the image size
+    (top, bottom, left, right), with the tesseract page segmentation mode and
+    character whitelist suited to what is printed there.
+    """
+
+    def __init__(self, name, box, psm, whitelist=None, prepare=_otsu):
+        self.name = name
+        self.box = box
+        self.prepare = prepare
+        self.psm = psm
+        self.whitelist = whitelist
+
+    def image(self, document):
+        top, bottom, left, right = self.box
+        crop = document.crop(top, bottom, left, right, source="gray")
+        return document.memo(("roi", self.name), lambda: self.prepare(crop))
+
+
+# --- Region maps per card type ---
+# Boxes are generous: card photos are rarely cropped tightly. PAN cards come
+# in two layouts (number above or below the name block), so both are tried.
+REGION_MAPS = {
+    "AADHAAR": [
+        # 12-digit number printed across the bottom of the front side
+        Region("aadhaar_number", (0.70, 1.0, 0.0, 1.0), psm=6, whitelist=DIGITS, prepare=_contrast_otsu),
+    ],
+    "PAN": [
+        Region("pan_number_upper", (0.15, 0.45, 0.0, 0.75), psm=11, whitelist=UPPER_ALNUM),
+        Region("pan_number_lower", (0.55, 0.90, 0.0, 0.75), psm=11, whitelist=UPPER_ALNUM),
+        # Name / father's name / DOB block left of the photo; labels are
+        # mixed case, so no whitelist here.
+        Region("name_block", (0.25, 0.85, 0.0, 0.70), psm=6),
+    ],
+    "VOTER_ID": [
+        Region("epic_number", (0.05, 0.40, 0.0, 1.0), psm=11, whitelist=UPPER_ALNUM),
+    ],
+}
+
+
+def ocr_regions(document, card_type):
+    """
+    OCR every region mapped for `card_type`, crops in parallel.
+    Returns {region name: text}; a failed region yields "". Memoized per document.
+    """
+    return document.memo(("roi_text", card_type), lambda: _ocr_all(document, REGION_MAPS.get(card_type, ())))
+
+
+def _ocr_all(document, regions):
+    texts = {}
+    executor = get_ocr_executor()
+    tesseract = get_tesseract()
+    futures = {}
+    for region in regions:
+        # Crops are built here, not in the OCR threads sharing the document.
+        try:
+            image = region.image(document)
+        except cv2.error as e:
+            logger.warning(f"⚠️ ROI '{region.name}' could not be prepared: {e}")
+            texts[region.name] = ""
+            continue
+        future = executor.submit(timed_ocr, document, "tesseract", f"roi:{region.name}",
+                                 tesseract.image_to_string, image, psm=region.psm, whitelist=region.whitelist)
+        futures[future] = region.name
+
+    for future in as_completed(futures):
+        name = futures[future]
+        try:
+            texts[name] = future.result()
+        except Exception as e:
+            logger.warning(f"⚠️ ROI OCR '{name}' failed: {e}")
+            texts[name] = ""
+        logger.debug(f"🎯 ROI {name}: {texts[name].strip()[:80]!r}")
+    return texts
@@ -0,0 +1,43 @@
+import importlib
+import logging
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("startup")
+
+# Import cost of each module/group, in the order they were imported at boot.
+IMPORT_TIMINGS = {}
+
+# Readiness as reported by /readyz.
+readiness = {
+    "ready": False,
+    "mode": None,
+    "models": {},
+    "error": None,
+}
+
+
+@contextmanager
+def timed_import(label):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        IMPORT_TIMINGS[label] = time.perf_counter() - start
+
+
+def timed_imports(module_names):
+    """Import third-party modules one by one, recording how long each took."""
+    for name in module_names:
+        with timed_import(name):
+            try:
+                importlib.import_module(name)
+            except ImportError:
+                pass
+
+
+def log_import_breakdown():
+    total = sum(IMPORT_TIMINGS.values())
+    logger.info(f"⏱  Import-time breakdown ({total * 1000:.0f} ms total):")
+    for label, seconds in sorted(IMPORT_TIMINGS.items(), key=lambda kv: -kv[1]):
+        logger.info(f"   {label:<28} {seconds * 1000:8.1f} ms")
@@ -1,16 +1,110 @@
-import json
-import os
+import re
 import logging
-from difflib import get_close_matches
+from difflib import SequenceMatcher, get_close_matches
+from functools import lru_cache
+
+from .template_registry import registry, TEMPLATE_DIR
 
 logger = logging.getLogger("template_mapper")
 
-TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "templates")
+FUZZY_CUTOFF = 0.65
+FUZZY_MEMO_SIZE = 1024
+
+# --- Known label spellings ---
+# Each group is one label as the extractors / OCR / users spell it. A template
+# alias that belongs to a group also matches every other spelling in it, and
+# a key in any group is a known label, never a fuzzy candidate for another.
+# Entries are normalized (see normalize_key).
+LABEL_VARIANTS = [
+    ("name", "full name", "mame", "nama", "naam"),
+    ("father name", "fathers name", "father", "fname"),
+    ("mother name", "mothers name", "mother"),
+    ("dob", "date of birth", "d o b", "d0b", "birth date"),
+    ("gender", "sex"),
+    ("aadhaar", "aadhaar number", "aadhaar no", "aadhar", "aadhar number", "aadhar no", "uid", "uid number"),
+    ("pan", "pan number", "pan no", "permanent account number"),
+    ("epic number", "epic", "epic no", "voter id"),
+    ("address", "addr", "adress"),
+    ("mobile", "mobile number", "mobile no", "phone number"),
+    ("relation name", "guardian name"),
+    ("relation type",),
+    ("place of birth", "birth place"),
+    ("institution", "institution name", "college"),
+]
+
+_POSSESSIVE = re.compile(r"['’]s\b")
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+@lru_cache(maxsize=4096)
+def normalize_key(key: str) -> str:
+    """Case- and punctuation-folded label: "Father's Name:" -> "father name"."""
+    folded = _POSSESSIVE.sub("", key.lower())
+    return _NON_ALNUM.sub(" ", folded).strip()
+
+
+_VARIANT_GROUP = {label: group for group in LABEL_VARIANTS for label in group}
+
+
+class CompiledMapping:
+    """
+    One template's mapping as a normalized alias index, built once per
+    template version. `aliases[field]` lists (normalized alias, strategy)
+    in priority order; `index` maps each alias back to its field.
+    Fuzzy lookups for keys outside the index are memoized here too.
+    """
+
+    def __init__(self, template):
+        self.template = template
+        self.mapping = template.get("mapping", {})
+        self.aliases = {}
+        self.index = {}
+        for field, possible_keys in self.mapping.items():
+            entries = []
+            seen = set()
+            for key in possible_keys:
+                norm = normalize_key(key)
+                for alias in (norm,) + _VARIANT_GROUP.get(norm, ()):
+                    if alias not in seen:
+                        seen.add(alias)
+                        entries.append((alias, "normalized" if alias == norm else "alias"))
+                        self.index.setdefault(alias, field)
+            self.aliases[field] = entries
+        self._alias_list = list(self.index)
+        self._fuzzy = {}
+
+    def fuzzy(self, norm_key):
+        """Closest (alias, score) for a key the index doesn't know, or None."""
+        if norm_key in self._fuzzy:
+            return self._fuzzy[norm_key]
+        close = get_close_matches(norm_key, self._alias_list, n=1, cutoff=FUZZY_CUTOFF)
+        found = None
+        if close:
+            found = (close[0], SequenceMatcher(None, norm_key, close[0]).ratio())
+        if len(self._fuzzy) >= FUZZY_MEMO_SIZE:
+            self._fuzzy.clear()
+        self._fuzzy[norm_key] = found
+        return found
+
+
+_compiled = {}  # template name -> CompiledMapping
+
+
+def compile_template(template_name, template):
+    """The alias index for `template`, rebuilt when the registry reloads it."""
+    compiled = _compiled.get(template_name)
+    if compiled is None or compiled.template is not template:
+        compiled = CompiledMapping(template)
+        _compiled[template_name] = compiled
+        logger.info(f"🧩 Compiled alias index for '{template_name}' ({len(compiled.index)} aliases)")
+    return compiled
+
 
 def map_fields_to_template(template_name: str, extracted_fields: dict):
     """
     Maps OCR extracted fields to official form fields based on the template JSON.
-    Adds detailed debug logging for troubleshooting.
+    Tries, per field: exact key, folded alias / known OCR spelling, then a
+    fuzzy match for keys the alias index has never seen.
     """
 
     logger.info("\n================ TEMPLATE MAPPING START ================")
@@ -22,55 +116,73 @@ def map_fields_to_template(template_name: str, extracted_fields: dict):
         logger.error("❌ Missing template_name in request")
         return {"error": "Invalid or missing template name"}
 
-    # Check if template directory exists
-    if not os.path.exists(TEMPLATE_DIR):
-        logger.error(f"❌ Template directory not found at path: {TEMPLATE_DIR}")
-        return {"error": f"Template directory not found at {TEMPLATE_DIR}"}
-
-    template_path = os.path.join(TEMPLATE_DIR, f"{template_name}.json")
-    logger.info(f"📂 Expected template path: {template_path}")
-
-    if not os.path.exists(template_path):
-        logger.error(f"❌ Template file not found: {template_path}")
+    template = registry.get(template_name)
+    if template is None:
+        logger.error(f"❌ Template not found or invalid: {template_name}")
         return {"error": f"Template '{template_name}' not found in {TEMPLATE_DIR}"}
-
-    # Try reading the template file
-    try:
-        with open(template_path, "r", encoding="utf-8") as f:
-            template = json.load(f)
-            mapping = template.get("mapping", {})
-
-    except Exception as e:
-        logger.exception(f"❌ Failed to load template JSON: {e}")
-        return {"error": f"Error loading template file: {str(e)}"}
+    compiled = compile_template(template_name, template)
+
+    # Normalize the incoming keys once. Keys present but empty still count as
+    # "seen": they claim their field so fuzzy matching can't fill it from a
+    # look-alike label (e.g. "Mother Name" for "Father Name").
+    by_alias = {}
+    unseen = []
+    for key, value in extracted_fields.items():
+        norm = normalize_key(key)
+        if norm in compiled.index:
+            if norm not in by_alias or (value and not extracted_fields[by_alias[norm]]):
+                by_alias[norm] = key
+        elif value and norm not in _VARIANT_GROUP:
+            unseen.append((key, norm))
+
+    fuzzy_hits = {}  # alias -> (score, key)
+    for key, norm in unseen:
+        found = compiled.fuzzy(norm)
+        if found and found[1] > fuzzy_hits.get(found[0], (0, None))[0]:
+            fuzzy_hits[found[0]] = (found[1], key)
 
     mapped_fields = {}
+    match_strategies = {}
 
-    for official_field, possible_keys in mapping.items():
+    for official_field, possible_keys in compiled.mapping.items():
         matched_value = ""
+        strategy = None
 
-        # Try exact match first
+        # Exact key first
         for key in possible_keys:
-            if key in extracted_fields and extracted_fields[key]:
+            if extracted_fields.get(key):
                 matched_value = extracted_fields[key]
+                strategy = "exact"
                 logger.info(f"✅ Exact match: {official_field} ← {key}")
                 break
 
-        # If not found, try fuzzy match
+        # Folded alias / known OCR spelling
         if not matched_value:
-            for key in possible_keys:
-                close = get_close_matches(key, extracted_fields.keys(), n=1, cutoff=0.65)
-                if close:
-                    matched_value = extracted_fields[close[0]]
-                    logger.info(f"🔸 Fuzzy match: {official_field} ← {close[0]} (for {key})")
+            for alias, kind in compiled.aliases[official_field]:
+                key = by_alias.get(alias)
+                if key is not None and extracted_fields[key]:
+                    matched_value = extracted_fields[key]
+                    strategy = kind
+                    logger.info(f"✅ {kind.title()} match: {official_field} ← {key}")
+                    break
+
+        # Fuzzy, only if none of the field's aliases was sent at all
+        if not matched_value and not any(alias in by_alias for alias, _ in compiled.aliases[official_field]):
+            for alias, _ in compiled.aliases[official_field]:
+                hit = fuzzy_hits.get(alias)
+                if hit:
+                    matched_value = extracted_fields[hit[1]]
+                    strategy = "fuzzy"
+                    logger.info(f"🔸 Fuzzy match: {official_field} ← {hit[1]} (for {alias}, {hit[0]:.2f})")
                     break
 
         mapped_fields[official_field] = matched_value
+        match_strategies[official_field] = strategy
 
     logger.info(f"✅ Mapping complete for template: {template_name}")
     for k, v in mapped_fields.items():
-        logger.info(f"   {k}: {v}")
+        logger.debug(f"   {k}: {v} [{match_strategies[k] or 'unmatched'}]")
 
     logger.info("================ TEMPLATE MAPPING END ================\n")
 
-    return {"template": template_name, "mapped_fields": mapped_fields}
\ No newline at end of file
+    return {"template": template_name, "mapped_fields": mapped_fields, "match_strategies": match_strategies}
@@ -0,0 +1,136 @@
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+from . import config
+
+logger = logging.getLogger("template_registry")
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "templates")
+
+
+class TemplateError(ValueError):
+    """A template file that doesn't match the mapping/layout schema."""
+
+
+def validate_template(name, template):
+    """Check the `mapping` / `layout` schema; raises TemplateError."""
+    if not isinstance(template, dict):
+        raise TemplateError(f"{name}: template must be a JSON object")
+
+    mapping = template.get("mapping")
+    if not isinstance(mapping, dict) or not mapping:
+        raise TemplateError(f"{name}: 'mapping' must be a non-empty object")
+    for field, keys in mapping.items():
+        if not isinstance(keys, list) or not all(isinstance(k, str) for k in keys):
+            raise TemplateError(f"{name}: mapping for '{field}' must be a list of strings")
+
+    layout = template.get("layout", {})
+    if not isinstance(layout, dict):
+        raise TemplateError(f"{name}: 'layout' must be an object")
+    for field, pos in layout.items():
+        if not isinstance(pos, dict) or not all(
+            isinstance(pos.get(axis), (int, float)) for axis in ("x", "y")
+        ):
+            raise TemplateError(f"{name}: layout for '{field}' needs numeric x and y")
+
+
+class TemplateRegistry:
+    """
+    All templates in TEMPLATE_DIR, parsed and validated once and served
+    from memory. A file is re-read only when its mtime changes; mtimes are
+    checked at most every TEMPLATE_RELOAD_INTERVAL seconds per template.
+    """
+
+    def __init__(self, template_dir=TEMPLATE_DIR, reload_interval=None):
+        self.template_dir = template_dir
+        self.reload_interval = config.TEMPLATE_RELOAD_INTERVAL if reload_interval is None else reload_interval
+        self._entries = {}  # name -> {"template", "mtime", "checked_at"}
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _path(self, name):
+        return os.path.join(self.template_dir, f"{name}.json")
+
+    def _load(self, name, mtime):
+        with open(self._path(name), "r", encoding="utf-8") as f:
+            template = json.load(f)
+        validate_template(name, template)
+        self._entries[name] = {"template": template, "mtime": mtime, "checked_at": time.monotonic()}
+        return template
+
+    def load_all(self):
+        """(Re)load every *.json template; invalid files are logged and skipped."""
+        with self._lock:
+            self._entries.clear()
+            for path in sorted(glob.glob(os.path.join(self.template_dir, "*.json"))):
+                name = os.path.splitext(os.path.basename(path))[0]
+                try:
+                    self._load(name, os.path.getmtime(path))
+                except (OSError, ValueError) as e:
+                    logger.error(f"❌ Skipping template '{name}': {e}")
+            self._loaded = True
+        logger.info(f"📚 Loaded {len(self._entries)} template(s) from {self.template_dir}")
+
+    def get(self, name):
+        """The parsed template, or None if there is no valid template by that name."""
+        if not self._loaded:
+            self.load_all()
+        if not name or os.path.basename(name) != name:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(name)
+            now = time.monotonic()
+            if entry is not None and now - entry["checked_at"] < self.reload_interval:
+                return entry["template"]
+
+            try:
+                mtime = os.path.getmtime(self._path(name))
+            except OSError:
+                # Removed (or never existed): forget it.
+                self._entries.pop(name, None)
+                return None
+
+            if entry is not None and entry["mtime"] == mtime:
+                entry["checked_at"] = now
+                return entry["template"]
+
+            try:
+                template = self._load(name, mtime)
+                logger.info(f"🔄 Reloaded template '{name}'")
+                return template
+            except (OSError, ValueError) as e:
+                logger.error(f"❌ Template '{name}' failed to reload: {e}")
+                self._entries.pop(name, None)
+                return None
+
+    def version(self, name):
+        """mtime of the loaded copy of `name` (call after get()), or None."""
+        entry = self._entries.get(name)
+        return entry["mtime"] if entry is not None else None
+
+    def list_templates(self):
+        if not self._loaded:
+            self.load_all()
+        # Listing is rare: glob so files added since startup show up too.
+        names = sorted(
+            os.path.splitext(os.path.basename(p))[0]
+            for p in glob.glob(os.path.join(self.template_dir, "*.json"))
+        )
+        summaries = []
+        for name in names:
+            template = self.get(name)
+            if template is not None:
+                summaries.append({
+                    "name": name,
+                    "form_name": template.get("form_name", name),
+                    "fields": list(template["mapping"].keys()),
+                })
+        return summaries
+
+
+registry = TemplateRegistry()
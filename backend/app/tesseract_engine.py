@@ -0,0 +1,176 @@
+import importlib.util
+import logging
+import threading
+
+import cv2
+import numpy as np
+
+from . import config
+from .document import DeadlineExceeded
+
+logger = logging.getLogger("tesseract_engine")
+
+# tesserocr binds libtesseract directly (optional).
+TESSEROCR_AVAILABLE = importlib.util.find_spec("tesserocr") is not None
+if TESSEROCR_AVAILABLE and config.TESSERACT_BACKEND in ("auto", "tesserocr"):
+    # Importing it installs signal handlers, which only works on the main
+    # thread; OCR runs in pool threads, so import it with this module.
+    import tesserocr
+
+PSM_AUTO = 3  # tesseract's default page segmentation mode
+
+
+def _group_words(words):
+    """
+    (text, line key, confidence) triples → text with line breaks preserved and
+    the mean word confidence (0-100). Non-words (confidence < 0) are skipped.
+    """
+    lines = {}
+    confs = []
+    for word, key, conf in words:
+        word = word.strip()
+        if not word or conf < 0:
+            continue
+        lines.setdefault(key, []).append(word)
+        confs.append(conf)
+    text = "\n".join(" ".join(ws) for ws in lines.values())
+    return text, (sum(confs) / len(confs) if confs else 0.0)
+
+
+class PytesseractBackend:
+    """
+    The tesseract CLI through pytesseract: every call forks a process,
+    writes the image to a temp file and loads the traineddata again.
+    """
+
+    name = "pytesseract"
+
+    @staticmethod
+    def _config(psm, whitelist):
+        cfg = f"--psm {psm}" if psm is not None else ""
+        if whitelist:
+            cfg += f" -c tessedit_char_whitelist={whitelist}"
+        return cfg.strip()
+
+    @staticmethod
+    def _run(fn, *args, timeout=None, **kwargs):
+        # pytesseract kills the process after `timeout` seconds (0 = never).
+        try:
+            return fn(*args, timeout=timeout or 0, **kwargs)
+        except RuntimeError as e:
+            if "timeout" in str(e).lower():
+                raise DeadlineExceeded(f"tesseract timed out after {timeout:.1f}s") from e
+            raise
+
+    def image_to_string(self, img, lang="eng", psm=None, whitelist=None, timeout=None):
+        import pytesseract
+        return self._run(pytesseract.image_to_string, img, lang=lang, config=self._config(psm, whitelist),
+                         timeout=timeout)
+
+    def image_to_text_conf(self, img, lang="eng", psm=None, timeout=None):
+        import pytesseract
+        data = self._run(pytesseract.image_to_data, img, lang=lang, config=self._config(psm, None),
+                         output_type=pytesseract.Output.DICT, timeout=timeout)
+        return _group_words(
+            (word, (data["block_num"][i], data["par_num"][i], data["line_num"][i]), float(data["conf"][i]))
+            for i, word in enumerate(data["text"])
+        )
+
+
+class TesserocrBackend:
+    """
+    libtesseract in-process through tesserocr. Each thread keeps one
+    initialized API per language set, so the traineddata is loaded once per
+    thread and images are handed over as raw pixels. tesserocr releases the
+    GIL while recognizing, so the OCR thread pool still runs in parallel.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _api(self, lang):
+        apis = self._local.__dict__.setdefault("apis", {})
+        api = apis.get(lang)
+        if api is None:
+            api = tesserocr.PyTessBaseAPI(lang=lang)
+            apis[lang] = api
+            logger.info(f"🔤 tesseract API '{lang}' initialized in {threading.current_thread().name}")
+        return api
+
+    def _prepare(self, img, lang, psm, whitelist):
+        api = self._api(lang)
+        # The API is reused: reset everything a previous call may have set.
+        api.SetPageSegMode(PSM_AUTO if psm is None else psm)
+        api.SetVariable("tessedit_char_whitelist", whitelist or "")
+
+        img = np.asarray(img)
+        if img.ndim == 3:
+            img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        img = np.ascontiguousarray(img, dtype=np.uint8)  # crops are strided views
+        height, width = img.shape[:2]
+        bpp = 1 if img.ndim == 2 else img.shape[2]
+        api.SetImageBytes(img.tobytes(), width, height, bpp, width * bpp)
+        return api
+
+    @staticmethod
+    def _recognize(api, timeout):
+        if timeout is None:
+            api.Recognize()
+        # libtesseract checks the deadline while recognizing words and gives up.
+        elif not api.Recognize(timeout=max(1, int(timeout * 1000))):
+            raise DeadlineExceeded(f"tesseract timed out after {timeout:.1f}s")
+
+    def image_to_string(self, img, lang="eng", psm=None, whitelist=None, timeout=None):
+        api = self._prepare(img, lang, psm, whitelist)
+        try:
+            self._recognize(api, timeout)
+            return api.GetUTF8Text()
+        finally:
+            api.Clear()
+
+    def image_to_text_conf(self, img, lang="eng", psm=None, timeout=None):
+        RIL = tesserocr.RIL
+        api = self._prepare(img, lang, psm, None)
+        try:
+            self._recognize(api, timeout)
+            words = []
+            line = 0
+            iterator = api.GetIterator()
+            if iterator is not None:
+                for word in tesserocr.iterate_level(iterator, RIL.WORD):
+                    if word.Empty(RIL.WORD):
+                        continue  # blank page: one empty word whose text raises
+                    if word.IsAtBeginningOf(RIL.TEXTLINE):
+                        line += 1
+                    words.append((word.GetUTF8Text(RIL.WORD) or "", line, word.Confidence(RIL.WORD)))
+        finally:
+            api.Clear()
+        return _group_words(words)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def backend_name():
+    """The backend TESSERACT_BACKEND resolves to in this environment."""
+    choice = config.TESSERACT_BACKEND
+    if choice == "tesserocr" or (choice == "auto" and TESSEROCR_AVAILABLE):
+        return "tesserocr"
+    return "pytesseract"
+
+
+def get_tesseract():
+    """Process-wide tesseract backend (see TESSERACT_BACKEND)."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = backend_name()
+                if name == "tesserocr" and not TESSEROCR_AVAILABLE:
+                    raise RuntimeError("FORMFILL_TESSERACT_BACKEND=tesserocr but tesserocr is not installed")
+                _backend = TesserocrBackend() if name == "tesserocr" else PytesseractBackend()
+                logger.info(f"🔧 Tesseract backend: {_backend.name}")
+    return _backend
@@ -1,61 +1,56 @@
 import re
-import cv2
-import numpy as np
-import pytesseract
 import logging
-from rich.logging import RichHandler
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(message)s",
-    datefmt="[%X]",
-    handlers=[RichHandler(rich_tracebacks=True)]
-)
+from .field_rules import FieldRules, Keywords
+from .ocr_engines import EASYOCR_AVAILABLE, read_with_easyocr
+from .roi_ocr import ocr_regions
+
 logger = logging.getLogger("voter_extractor")
 
-# Try to import EasyOCR (optional)
-try:
-    import easyocr
-    EASYOCR_AVAILABLE = True
-    _easyocr_reader = None
-except ImportError:
-    EASYOCR_AVAILABLE = False
-    logger.warning("⚠️ EasyOCR not available. Install with: pip install easyocr")
+# --- Field rules (compiled once at import) ---
+NAME_SKIP_BELOW = ('election', 'commission', 'india', 'voter', 'epic',
+                   'father', 'mother', 'card', 'photo', 'identity')
+NAME_SKIP_INLINE = ('election', 'commission', 'india', 'voter', 'epic', 'card',
+                    'photo', 'identity', 'elector', 'father', 'mother')
+RELATION_LABELS = (("father", "Father"), ("mother", "Mother"), ("relation", "Relation"))
 
-def get_easyocr_reader():
-    """Lazy load EasyOCR reader (initialized once)."""
-    global _easyocr_reader
-    if _easyocr_reader is None and EASYOCR_AVAILABLE:
-        _easyocr_reader = easyocr.Reader(['en'], gpu=False)
-    return _easyocr_reader
+VOTER_RULES = FieldRules(
+    "VOTER_ID",
+    labels={
+        # Standalone "Name" or common OCR errors (value on the next line)
+        "name_alone": (r'^\s*(Name|Mame|Nama)\s*$', re.IGNORECASE),
+        "name_inline": (r'\bName\s*[:\-]', re.IGNORECASE),
+        "parent": Keywords("father", "mother"),
+        "father": (r'Father[\'’s\s]*Name', re.IGNORECASE),
+        "mother": (r'Mother[\'’s\s]*Name', re.IGNORECASE),
+        "relation": (r'Relation[\'’s\s]*Name', re.IGNORECASE),
+        "address": Keywords("address", "c/o", "s/o"),
+        "address_end": Keywords("epic", "election", "age"),
+    },
+    patterns={
+        "epic_3_7": r'\b([A-Z]{3}\d{7})\b',
+        "epic_2_8": r'\b([A-Z]{2}\d{8})\b',
+        "epic_loose": r'([A-Z]{2,3}\s?\d{7,8})',
+        "name_value": (r'Name\s*[:\-]?\s*([A-Za-z][A-Za-z\s]{2,50})', re.IGNORECASE),
+        "relation_inline": r':\s*([A-Za-z\s]{2,40})',
+        "relation_line": r'^[A-Za-z\s]{2,40}$',
+        "dob_labelled": (r'(?:DOB|Date\s*of\s*Birth)[:\s]*(\d{1,2}[-/\.]\d{1,2}[-/\.]\d{2,4})', re.IGNORECASE),
+        "dob_any": (r'\b(\d{1,2}[-/\.]\d{1,2}[-/\.]\d{4})\b', re.IGNORECASE),
+        "gender": (r'\b(Male|Female|M|F)\b', re.IGNORECASE),
+        "address_value": (r'(?:address|पता)\s*[:\-]?\s*(.*)', re.IGNORECASE),
+    },
+    cleaners={
+        "spaces": [(r'\s+', ' ')],
+    },
+)
+R = VOTER_RULES
 
-def extract_with_easyocr(file_bytes):
-    """Extract text using EasyOCR - optimized for speed."""
-    if not EASYOCR_AVAILABLE:
-        return None
-    try:
-        reader = get_easyocr_reader()
-        if reader is None:
-            return None
-        # Decode image
-        image_stream = np.frombuffer(file_bytes, np.uint8)
-        img = cv2.imdecode(image_stream, cv2.IMREAD_COLOR)
-        if img is None:
-            return None
-        # Reduced scale for faster processing
-        scale = 1.5
-        img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
-        # Run EasyOCR
-        results = reader.readtext(img)
-        # Combine all detected text with confidence > 0.3
-        text_parts = [text for (bbox, text, conf) in results if conf > 0.3]
-        combined_text = "\n".join(text_parts)
-        return combined_text
-    except Exception as e:
-        logger.warning(f"⚠️ EasyOCR extraction failed: {e}")
-        return None
+def extract_with_easyocr(document):
+    """EasyOCR text of the document; shared with the OCR cascade if it already ran EasyOCR."""
+    result = read_with_easyocr(document)
+    return result[0] if result is not None else None
 
-def extract_fields_from_text(text: str, file_bytes=None) -> dict:
+def extract_fields_from_text(text: str, document=None) -> dict:
     """
     Extract fields from Indian Voter ID card.
     Optimized hybrid approach: EasyOCR primary.
@@ -71,114 +66,102 @@ def extract_fields_from_text(text: str, file_bytes=None) -> dict:
         "Address": None,
     }
     all_text = text
-    if file_bytes:
+    if document is not None:
         # --- EasyOCR extraction ---
         if EASYOCR_AVAILABLE:
             logger.info("🔍 Attempting EasyOCR extraction...")
-            easyocr_text = extract_with_easyocr(file_bytes)
+            easyocr_text = extract_with_easyocr(document)
             if easyocr_text and len(easyocr_text.strip()) > 50:
                 all_text = easyocr_text
                 logger.info(f"✅ Using EasyOCR text ({len(all_text)} chars)")
-                logger.info(f"📝 EasyOCR preview:\n{all_text[:300]}")
+                logger.debug(f"📝 EasyOCR preview:\n{all_text[:300]}")
     if not all_text.strip():
         logger.warning("⚠️ No text available for extraction")
         return fields
     lines = [line.strip() for line in all_text.split('\n') if line.strip()]
     logger.info(f"📄 Processing {len(lines)} lines")
 
-    # --- EPIC Number ---
-    epic_patterns = [
-        r'\b([A-Z]{3}\d{7})\b',
-        r'\b([A-Z]{2}\d{8})\b',
-        r'([A-Z]{2,3}\s?\d{7,8})',
-    ]
-    text_clean = all_text.replace(" ", "").replace("\n", " ").upper()
-    for pattern in epic_patterns:
-        match = re.search(pattern, text_clean)
-        if match:
-            epic = match.group(1).replace(" ", "")
-            if len(epic) in [10, 11]:
-                fields["EPIC Number"] = epic
-                logger.info(f"✅ EPIC Number: {epic}")
-                break
+    scan = R.scan(lines)
+
+    # --- EPIC Number (whitelisted ROI text first, then the full text) ---
+    epic_sources = [all_text]
+    if document is not None:
+        epic_sources.insert(0, ocr_regions(document, "VOTER_ID").get("epic_number", ""))
+    for source in epic_sources:
+        text_clean = source.replace(" ", "").replace("\n", " ").upper()
+        for pattern in ("epic_3_7", "epic_2_8", "epic_loose"):
+            match = R.search(pattern, text_clean)
+            if match:
+                epic = match.group(1).replace(" ", "")
+                if len(epic) in [10, 11]:
+                    fields["EPIC Number"] = epic
+                    logger.debug(f"✅ EPIC Number: {epic}")
+                    break
+        if fields["EPIC Number"]:
+            break
 
     # --- Name (line-by-line approach) ---
-    for i, line in enumerate(lines):
-        # Look for standalone "Name" or common OCR errors
-        if re.match(r'^\s*(Name|Mame|Nama)\s*$', line, re.IGNORECASE):
+    name_lines = sorted(set(scan.indexes("name_alone")) | (set(scan.indexes("name_inline")) - set(scan.indexes("parent"))))
+    for i in name_lines:
+        if scan.has("name_alone", i):
             # Name should be on next line
             if i + 1 < len(lines):
                 next_line = lines[i + 1].strip()
-                skip = ['election', 'commission', 'india', 'voter', 'epic', 
-                        'father', 'mother', 'card', 'photo', 'identity']
-                if not any(s in next_line.lower() for s in skip) and len(next_line) > 2:
+                if not any(s in next_line.lower() for s in NAME_SKIP_BELOW) and len(next_line) > 2:
                     fields["Name"] = next_line.title()
-                    logger.info(f"✅ Name (below label): {next_line}")
+                    logger.debug(f"✅ Name (below label): {next_line}")
                     break
         # Fallback: Inline "Name : VALUE" (but not "Father's" or "Mother's" Name)
-        if re.search(r'\bName\s*[:\-]', line, re.IGNORECASE) and not re.search(r'(Father|Mother)', line, re.IGNORECASE):
-            name_match = re.search(r'Name\s*[:\-]?\s*([A-Za-z][A-Za-z\s]{2,50})', line, re.IGNORECASE)
+        if scan.has("name_inline", i) and not scan.has("parent", i):
+            name_match = R.search("name_value", lines[i])
             if name_match:
-                name = name_match.group(1).strip()
-                name = re.sub(r'\s+', ' ', name)
-                skip = ['election', 'commission', 'india', 'voter', 'epic', 'card', 
-                        'photo', 'identity', 'elector', 'father', 'mother']
-                if not any(s in name.lower() for s in skip):
+                name = R.clean("spaces", name_match.group(1))
+                if not any(s in name.lower() for s in NAME_SKIP_INLINE):
                     fields["Name"] = name.title()
-                    logger.info(f"✅ Name (inline): {name}")
+                    logger.debug(f"✅ Name (inline): {name}")
                     break
 
     # --- Father/Mother/Relation Extraction (new) ---
-    if not fields["Relation Name"]:
-        relation_patterns = [
-            (r'Father[\'’s\s]*Name', "Father"),
-            (r'Mother[\'’s\s]*Name', "Mother"),
-            (r'Relation[\'’s\s]*Name', "Relation"),
-        ]
-        for rel_pat, rel_type in relation_patterns:
-            for i, line in enumerate(lines):
-                if re.search(rel_pat, line, re.IGNORECASE):
-                    # Try to extract from same line first
-                    same_line_match = re.search(r':\s*([A-Za-z\s]{2,40})', line)
-                    name_val = None
-                    if same_line_match:
-                        name_val = same_line_match.group(1).strip()
-                        # Optionally check next lines for surname extension
-                        for j in range(1, 3):
-                            if i + j < len(lines):
-                                next_line = lines[i + j].strip()
-                                if re.match(r'^[A-Za-z\s]{2,40}$', next_line):
-                                    name_val += " " + next_line
-                                else:
-                                    break
-                    else:
-                        # Try the next line if not found on same line
-                        if i + 1 < len(lines):
-                            next_line = lines[i + 1].strip()
-                            if re.match(r'^[A-Za-z\s]{2,40}$', next_line):
-                                name_val = next_line
-                    if name_val and len(name_val) > 2:
-                        fields["Relation Name"] = name_val.title()
-                        fields["Relation Type"] = rel_type
-                        logger.info(f"✅ {rel_type}'s Name: {name_val}")
-                        break
-            if fields["Relation Name"]:
+    for label, rel_type in RELATION_LABELS:
+        for i, _ in scan.hits(label):
+            line = lines[i]
+            # Try to extract from same line first
+            same_line_match = R.search("relation_inline", line)
+            name_val = None
+            if same_line_match:
+                name_val = same_line_match.group(1).strip()
+                # Optionally check next lines for surname extension
+                for j in range(1, 3):
+                    if i + j < len(lines):
+                        next_line = lines[i + j].strip()
+                        if R.match("relation_line", next_line):
+                            name_val += " " + next_line
+                        else:
+                            break
+            else:
+                # Try the next line if not found on same line
+                if i + 1 < len(lines):
+                    next_line = lines[i + 1].strip()
+                    if R.match("relation_line", next_line):
+                        name_val = next_line
+            if name_val and len(name_val) > 2:
+                fields["Relation Name"] = name_val.title()
+                fields["Relation Type"] = rel_type
+                logger.debug(f"✅ {rel_type}'s Name: {name_val}")
                 break
+        if fields["Relation Name"]:
+            break
 
     # --- DOB ---
-    dob_patterns = [
-        r'(?:DOB|Date\s*of\s*Birth)[:\s]*(\d{1,2}[-/\.]\d{1,2}[-/\.]\d{2,4})',
-        r'\b(\d{1,2}[-/\.]\d{1,2}[-/\.]\d{4})\b',
-    ]
-    for pattern in dob_patterns:
-        match = re.search(pattern, all_text, re.IGNORECASE)
+    for pattern in ("dob_labelled", "dob_any"):
+        match = R.search(pattern, all_text)
         if match:
             fields["DOB"] = match.group(1).strip()
-            logger.info(f"✅ DOB: {fields['DOB']}")
+            logger.debug(f"✅ DOB: {fields['DOB']}")
             break
 
     # --- Gender ---
-    gender_match = re.search(r'\b(Male|Female|M|F)\b', all_text, re.IGNORECASE)
+    gender_match = R.search("gender", all_text)
     if gender_match:
         gender = gender_match.group(1).upper()
         if gender in ['MALE', 'M']:
@@ -186,20 +169,20 @@ def extract_fields_from_text(text: str, file_bytes=None) -> dict:
         elif gender in ['FEMALE', 'F']:
             fields["Gender"] = "Female"
         if fields["Gender"]:
-            logger.info(f"✅ Gender: {fields['Gender']}")
+            logger.debug(f"✅ Gender: {fields['Gender']}")
 
     # --- Address ---
     address_lines = []
     capture = False
-    for line in lines:
-        if any(kw in line.lower() for kw in ['address', 'c/o', 's/o']):
+    for i, line in enumerate(lines):
+        if scan.has("address", i):
             capture = True
-            addr_match = re.search(r'(?:address|पता)\s*[:\-]?\s*(.*)', line, re.IGNORECASE)
+            addr_match = R.search("address_value", line)
             if addr_match and len(addr_match.group(1).strip()) > 3:
                 address_lines.append(addr_match.group(1).strip())
             continue
         if capture:
-            if any(kw in line.lower() for kw in ['epic', 'election', 'age']):
+            if scan.has("address_end", i):
                 break
             if len(line) > 3:
                 address_lines.append(line)
@@ -207,14 +190,13 @@ def extract_fields_from_text(text: str, file_bytes=None) -> dict:
                     break
     if address_lines:
         fields["Address"] = ', '.join(address_lines)
-        logger.info(f"✅ Address: {fields['Address'][:60]}...")
+        logger.debug(f"✅ Address: {fields['Address'][:60]}...")
 
     # --- Summary ---
-    logger.info("\n🗳️ Voter ID Extraction Complete:")
     extracted_count = sum(1 for v in fields.values() if v)
-    logger.info(f"   📊 Extracted {extracted_count}/{len(fields)} fields")
+    logger.info(f"🗳️ Voter ID extraction complete: {extracted_count}/{len(fields)} fields")
     for key, value in fields.items():
         if value:
-            logger.info(f"   {key}: {value}")
+            logger.debug(f"   {key}: {value}")
 
     return fields
\ No newline at end of file
@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from starlette.concurrency import run_in_threadpool
+
+from . import config
+from .logging_config import request_id, with_request_id
+from .metrics import ERRORS
+
+logger = logging.getLogger("worker_pool")
+
+_executor = None
+
+
+def start_pool():
+    """Create the OCR process pool (no-op when OCR_WORKERS is 0)."""
+    global _executor
+    if _executor is not None or config.OCR_WORKERS <= 0:
+        return _executor
+
+    _executor = _new_executor()
+    logger.info(f"🧵 OCR pool started with {config.OCR_WORKERS} worker(s) ({config.OCR_POOL_START_METHOD})")
+    return _executor
+
+
+def _new_executor():
+    from .pipeline import init_worker
+
+    ctx = multiprocessing.get_context(config.OCR_POOL_START_METHOD)
+    return ProcessPoolExecutor(
+        max_workers=config.OCR_WORKERS,
+        mp_context=ctx,
+        initializer=init_worker,
+    )
+
+
+def _replace_broken_pool(broken):
+    """
+    Swap a pool whose worker died for a fresh one. Every task in flight on
+    the broken pool fails at once; only the first of them replaces it (this
+    runs on the event loop, so the identity check cannot race).
+    """
+    global _executor
+    if _executor is not broken:
+        return
+    broken.shutdown(wait=False, cancel_futures=True)
+    _executor = _new_executor()
+    ERRORS.inc(kind="worker_crash")
+    logger.error("💥 OCR worker died — pool restarted")
+
+
+def shutdown_pool():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+        logger.info("🧵 OCR pool stopped")
+
+
+async def run_in_pool(fn, *args):
+    """
+    Run a blocking pipeline function off the event loop.
+    Uses the process pool when it is running, a worker thread otherwise.
+    The current request id goes along, so worker log lines carry it.
+
+    If a worker process dies, the pool is replaced and the calls that were
+    running on it fail with BrokenProcessPool; later calls use the new pool.
+    The call is not retried: the input may be what killed the worker.
+    """
+    executor = _executor
+    if executor is None:
+        return await run_in_threadpool(fn, *args)
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(executor, with_request_id, request_id.get(), fn, *args)
+    except BrokenProcessPool:
+        _replace_broken_pool(executor)
+        raise
+
+
+async def warm_pool(task):
+    """
+    Submit one `task` per worker so every process is spawned and has run
+    its initializer. Returns the task results.
+    """
+    if _executor is None:
+        return []
+    return await asyncio.gather(*(run_in_pool(task) for _ in range(config.OCR_WORKERS)))
@@ -0,0 +1,172 @@
+"""
+Synthetic card corpus for the benchmarks.
+
+Aadhaar, PAN and Voter ID fronts are drawn with PIL from seeded random
+field values, then degraded (noise, blur, rotation, resolution). The same
+seed always yields the same images and ground truth, so runs on different
+machines and commits are comparable. Nothing is downloaded.
+"""
+import io
+import json
+import os
+import random
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+CARD_TYPES = ("AADHAAR", "PAN", "VOTER_ID")
+VARIANTS = ("clean", "noise", "blur", "rotate", "lowres", "hires")
+
+# ID-1 card proportions
+CARD_SIZE = (1012, 638)
+
+FIRST_NAMES = ["Rahul", "Priya", "Amit", "Sunita", "Vikram", "Anjali", "Rohan", "Kavita",
+               "Suresh", "Meena", "Arjun", "Pooja", "Manoj", "Neha", "Deepak", "Lakshmi"]
+LAST_NAMES = ["Sharma", "Verma", "Singh", "Kumar", "Patel", "Reddy", "Nair", "Gupta",
+              "Das", "Yadav", "Joshi", "Iyer", "Mehta", "Rao", "Chauhan", "Mishra"]
+LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+def _font(size):
+    # Pillow's bundled FreeType font; no system fonts needed.
+    return ImageFont.load_default(size=size)
+
+
+def _person(rng):
+    """(name, father's name) sharing a surname."""
+    first, father = rng.sample(FIRST_NAMES, 2)
+    last = rng.choice(LAST_NAMES)
+    return f"{first} {last}", f"{father} {last}"
+
+
+def _dob(rng):
+    return f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(1950, 2005)}"
+
+
+# --- Card faces: (lines as (x, y, text, size), photo box, ground truth) ---
+def _aadhaar(rng):
+    name, father = _person(rng)
+    dob = _dob(rng)
+    gender = rng.choice(["Male", "Female"])
+    number = f"{rng.randint(2, 9)}{rng.randint(0, 999):03d} {rng.randint(0, 9999):04d} {rng.randint(0, 9999):04d}"
+    lines = [
+        (300, 40, "GOVERNMENT OF INDIA", 34),
+        (300, 180, name, 30),
+        (300, 230, f"Father : {father}", 28),
+        (300, 280, f"DOB : {dob}", 28),
+        (300, 330, gender, 28),
+        (300, 520, number, 44),
+    ]
+    truth = {"Name": name, "DOB": dob, "Gender": gender, "Aadhaar": number}
+    return lines, (40, 150, 260, 470), truth
+
+
+def _pan(rng):
+    name, father = _person(rng)
+    dob = _dob(rng)
+    pan = "".join(rng.choice(LETTERS) for _ in range(3)) + "P" + name.split()[-1][0].upper() \
+        + f"{rng.randint(0, 9999):04d}" + rng.choice(LETTERS)
+    lines = [
+        (40, 30, "INCOME TAX DEPARTMENT", 32),
+        (600, 30, "GOVT. OF INDIA", 32),
+        (40, 130, "Permanent Account Number Card", 28),
+        (40, 175, pan, 36),
+        (40, 260, "Name", 24),
+        (40, 295, name.upper(), 30),
+        (40, 360, "Father's Name", 24),
+        (40, 395, father.upper(), 30),
+        (40, 460, "Date of Birth", 24),
+        (40, 495, dob, 30),
+    ]
+    truth = {"Name": name, "Father Name": father, "DOB": dob, "PAN": pan}
+    return lines, (760, 140, 970, 420), truth
+
+
+def _voter(rng):
+    name, father = _person(rng)
+    gender = rng.choice(["Male", "Female"])
+    dob = _dob(rng)
+    epic = "".join(rng.choice(LETTERS) for _ in range(3)) + f"{rng.randint(0, 9999999):07d}"
+    lines = [
+        (40, 30, "ELECTION COMMISSION OF INDIA", 32),
+        (40, 80, "IDENTITY CARD", 28),
+        (40, 150, epic, 34),
+        (300, 240, f"Name : {name}", 28),
+        (300, 290, f"Father's Name : {father}", 28),
+        (300, 340, f"Sex : {gender}", 28),
+        (300, 390, f"Date of Birth : {dob}", 28),
+    ]
+    truth = {"Name": name, "EPIC Number": epic, "Gender": gender, "DOB": dob}
+    return lines, (40, 240, 260, 470), truth
+
+
+FACES = {"AADHAAR": _aadhaar, "PAN": _pan, "VOTER_ID": _voter}
+
+
+def _draw(lines, photo_box, rng):
+    tint = tuple(rng.randint(225, 250) for _ in range(3))
+    img = Image.new("RGB", CARD_SIZE, tint)
+    draw = ImageDraw.Draw(img)
+    draw.rectangle(photo_box, fill=(200, 200, 200), outline=(90, 90, 90), width=3)
+    ink = tuple(rng.randint(0, 50) for _ in range(3))
+    for x, y, text, size in lines:
+        draw.text((x, y), text, fill=ink, font=_font(size))
+    return img
+
+
+# --- Degradations ---
+def _degrade(img, variant, rng):
+    if variant == "noise":
+        arr = np.asarray(img, dtype=np.int16)
+        noise = np.random.default_rng(rng.randint(0, 2**31)).normal(0, 18, arr.shape)
+        return Image.fromarray(np.clip(arr + noise, 0, 255).astype(np.uint8))
+    if variant == "blur":
+        return img.filter(ImageFilter.GaussianBlur(1.6))
+    if variant == "rotate":
+        angle = rng.choice([-1, 1]) * rng.uniform(2, 5)
+        return img.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=(255, 255, 255))
+    if variant == "lowres":
+        return img.resize((img.width * 11 // 20, img.height * 11 // 20), Image.LANCZOS)
+    if variant == "hires":
+        # Phone-photo sized: exercises decode-time downscaling and normalization.
+        return img.resize((img.width * 4, img.height * 4), Image.BICUBIC)
+    return img
+
+
+def build_corpus(per_type=4, variants=VARIANTS, seed=1234):
+    """
+    List of samples {"id", "card_type", "variant", "image" (JPEG bytes),
+    "truth" (expected fields)}; per_type cards per type, each in every variant.
+    """
+    samples = []
+    for card_type in CARD_TYPES:
+        for n in range(per_type):
+            # Seeded per card and per variant: a subset of either is still the same images.
+            card_id = f"{card_type.lower()}-{n:02d}"
+            rng = random.Random(f"{seed}-{card_id}")
+            lines, photo_box, truth = FACES[card_type](rng)
+            base = _draw(lines, photo_box, rng)
+            for variant in variants:
+                buf = io.BytesIO()
+                _degrade(base, variant, random.Random(f"{seed}-{card_id}-{variant}")).save(buf, "JPEG", quality=90)
+                samples.append({
+                    "id": f"{card_id}-{variant}",
+                    "card_type": card_type,
+                    "variant": variant,
+                    "image": buf.getvalue(),
+                    "truth": truth,
+                })
+    return samples
+
+
+def write_corpus(directory, **kwargs):
+    """Write the corpus as JPEG files plus truth.json, for inspecting it by eye."""
+    os.makedirs(directory, exist_ok=True)
+    truth = {}
+    for sample in build_corpus(**kwargs):
+        with open(os.path.join(directory, f"{sample['id']}.jpg"), "wb") as f:
+            f.write(sample["image"])
+        truth[sample["id"]] = {"card_type": sample["card_type"], "fields": sample["truth"]}
+    with open(os.path.join(directory, "truth.json"), "w", encoding="utf-8") as f:
+        json.dump(truth, f, indent=2)
+    return len(truth)
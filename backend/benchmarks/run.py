@@ -0,0 +1,266 @@
+"""
+End-to-end /extract benchmark.
+
+Starts the API locally (or targets --url), posts the synthetic corpus with
+a concurrent client (no_cache=true, so every request runs the pipeline) and
+reports latency percentiles, throughput and per-card field accuracy against
+the corpus ground truth.
+
+    cd backend
+    pip install -r benchmarks/requirements.txt   # the API's deps + httpx
+    python -m benchmarks.run                     # compare with baselines/default.json
+    python -m benchmarks.run --save-baseline     # record this machine's numbers
+    python -m benchmarks.run --per-type 2 --concurrency 8 --rounds 3
+
+Exits 1 when a latency percentile is more than --tolerance slower than the
+stored baseline, or a card type's accuracy drops more than
+--accuracy-tolerance. Baselines are machine-specific: record them on the
+machine that runs the comparison.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+from .corpus import CARD_TYPES, VARIANTS, build_corpus
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+LATENCY_KEYS = ("p50", "p95", "p99")
+
+
+# --- Local server ---
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(startup_timeout):
+    """Run uvicorn on a free port; returns (process, base url) once /readyz is ready."""
+    port = _free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + startup_timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited during startup (code {proc.returncode})")
+        try:
+            if httpx.get(f"{url}/readyz", timeout=2).status_code == 200:
+                return proc, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    proc.terminate()
+    raise RuntimeError(f"server not ready after {startup_timeout}s")
+
+
+# --- Load ---
+async def _post(client, sample):
+    start = time.perf_counter()
+    response = await client.post(
+        "/extract",
+        params={"no_cache": "true"},
+        files={"file": (f"{sample['id']}.jpg", sample["image"], "image/jpeg")},
+    )
+    latency = time.perf_counter() - start
+    body = response.json() if response.status_code == 200 else {}
+    return {"sample": sample, "status": response.status_code, "latency": latency, "body": body}
+
+
+async def drive(url, samples, concurrency, rounds, timeout):
+    """Post every sample `rounds` times, at most `concurrency` in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        # Warm-up (not measured): one upload per card type.
+        for card_type in CARD_TYPES:
+            await _post(client, next(s for s in samples if s["card_type"] == card_type))
+
+        async def one(sample):
+            async with semaphore:
+                try:
+                    return await _post(client, sample)
+                except httpx.HTTPError as e:
+                    return {"sample": sample, "status": None, "latency": None, "body": {}, "error": str(e)}
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one(s) for _ in range(rounds) for s in samples))
+        wall = time.perf_counter() - start
+    return results, wall
+
+
+# --- Report ---
+def percentile(values, q):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def _norm(value):
+    return re.sub(r'[^a-z0-9]', '', str(value or "").lower())
+
+
+def _latency_stats(latencies):
+    if not latencies:
+        return {key: None for key in LATENCY_KEYS}
+    return {f"p{q}": round(percentile(latencies, q), 3) for q in (50, 95, 99)}
+
+
+def summarize(results, wall):
+    ok = [r for r in results if r["status"] == 200]
+    report = {
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "failed": sorted({f"{r['sample']['id']} ({r['status'] or r.get('error')})" for r in results if r["status"] != 200}),
+        "wall_seconds": round(wall, 2),
+        "rps": round(len(ok) / wall, 2) if wall else 0.0,
+        **_latency_stats([r["latency"] for r in ok]),
+        "cards": {},
+        "variants": {},
+    }
+
+    def accumulate(bucket, r):
+        truth = r["sample"]["truth"]
+        fields = r["body"].get("fields") or {}
+        bucket["requests"] += 1
+        bucket["type_correct"] += r["body"].get("card_type") == r["sample"]["card_type"]
+        bucket["fields_total"] += len(truth)
+        bucket["fields_correct"] += sum(_norm(fields.get(k)) == _norm(v) for k, v in truth.items())
+        if r["latency"] is not None:
+            bucket["latencies"].append(r["latency"])
+
+    def empty():
+        return {"requests": 0, "type_correct": 0, "fields_total": 0, "fields_correct": 0, "latencies": []}
+
+    cards = {card: empty() for card in CARD_TYPES}
+    variants = {variant: empty() for variant in VARIANTS}
+    for r in results:
+        accumulate(cards[r["sample"]["card_type"]], r)
+        accumulate(variants[r["sample"]["variant"]], r)
+
+    for name, buckets in (("cards", cards), ("variants", variants)):
+        for key, b in buckets.items():
+            if not b["requests"]:
+                continue
+            report[name][key] = {
+                "requests": b["requests"],
+                "card_type_accuracy": round(b["type_correct"] / b["requests"], 3),
+                "field_accuracy": round(b["fields_correct"] / b["fields_total"], 3),
+                **_latency_stats(b["latencies"]),
+            }
+    return report
+
+
+def print_report(report):
+    print(f"\n{report['requests']} requests, {report['errors']} errors in {report['wall_seconds']}s "
+          f"— {report['rps']} req/s")
+    print(f"latency p50 {report['p50']}s  p95 {report['p95']}s  p99 {report['p99']}s")
+    for failed in report["failed"]:
+        print(f"   failed: {failed}")
+    for name in ("cards", "variants"):
+        print(f"\n{name[:-1]:<10} {'n':>4} {'type acc':>9} {'field acc':>10} {'p50':>7} {'p95':>7}")
+        for key, row in report[name].items():
+            print(f"{key:<10} {row['requests']:>4} {row['card_type_accuracy']:>9.1%} "
+                  f"{row['field_accuracy']:>10.1%} {row['p50'] or 0:>7.3f} {row['p95'] or 0:>7.3f}")
+
+
+# --- Baselines ---
+def compare(report, baseline, tolerance, accuracy_tolerance):
+    """Regressions of `report` against `baseline`, as messages (empty = pass)."""
+    failures = []
+    for key in LATENCY_KEYS:
+        base, now = baseline.get(key), report.get(key)
+        if base and now and now > base * (1 + tolerance):
+            failures.append(f"{key} latency {now:.3f}s > baseline {base:.3f}s (+{tolerance:.0%})")
+    for card, base_row in baseline.get("cards", {}).items():
+        row = report["cards"].get(card)
+        if row and row["field_accuracy"] < base_row["field_accuracy"] - accuracy_tolerance:
+            failures.append(f"{card} field accuracy {row['field_accuracy']:.1%} "
+                            f"< baseline {base_row['field_accuracy']:.1%}")
+    if report["errors"]:
+        failures.append(f"{report['errors']} request(s) failed")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="benchmark a running server instead of starting one")
+    parser.add_argument("--per-type", type=int, default=4, help="cards per card type (each in every variant)")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=1, help="times each sample is posted")
+    parser.add_argument("--timeout", type=float, default=120, help="per-request timeout (s)")
+    parser.add_argument("--startup-timeout", type=float, default=300)
+    parser.add_argument("--baseline", default="default", help="name of the baseline in benchmarks/baselines/")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.20, help="allowed latency slowdown (0.20 = 20%%)")
+    parser.add_argument("--accuracy-tolerance", type=float, default=0.05)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    samples = build_corpus(per_type=args.per_type, seed=args.seed)
+    print(f"Corpus: {len(samples)} images ({args.per_type} per card type × {len(VARIANTS)} variants)")
+
+    proc = None
+    url = args.url
+    if url is None:
+        proc, url = start_server(args.startup_timeout)
+        print(f"Server ready at {url}")
+    try:
+        results, wall = asyncio.run(drive(url, samples, args.concurrency, args.rounds, args.timeout))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    report = summarize(results, wall)
+    report["settings"] = {"per_type": args.per_type, "seed": args.seed,
+                          "concurrency": args.concurrency, "rounds": args.rounds}
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    baseline_path = os.path.join(BASELINE_DIR, f"{args.baseline}.json")
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline saved to {baseline_path}")
+        return 0
+
+    if not os.path.exists(baseline_path):
+        print(f"\nNo baseline at {baseline_path}; run with --save-baseline to record one.")
+        return 0
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("settings") != report["settings"]:
+        print(f"\n⚠️ Baseline was recorded with {baseline.get('settings')}; numbers may not be comparable.")
+    failures = compare(report, baseline, args.tolerance, args.accuracy_tolerance)
+    if failures:
+        print("\n❌ Regression against baseline:")
+        for failure in failures:
+            print(f"   {failure}")
+        return 1
+    print("\n✅ Within baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
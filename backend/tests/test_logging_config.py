@@ -0,0 +1,12 @@
+from app.logging_config import redact
+
+
+def test_redact_keeps_last_four_characters():
+    assert redact("Aadhaar 1234 5678 9012") == "Aadhaar **********9012"
+    assert redact("Aadhaar 123456789012") == "Aadhaar ********9012"
+    assert redact("PAN ABCDE1234F") == "PAN ******234F"
+    assert redact("EPIC ABC1234567") == "EPIC ******4567"
+
+
+def test_redact_leaves_other_text_alone():
+    assert redact("DOB 21/08/1950, pin 560001") == "DOB 21/08/1950, pin 560001"